@@ -0,0 +1,247 @@
+"""Benchmark du pipeline de classement sur des données synthétiques.
+
+Génère des structures all_scores (même format que le scraping) à
+différentes tailles, puis chronomètre chaque étape du pipeline de main.py :
+index des épreuves, calcul des scores, construction/tri du DataFrame, flux JSON
+des classements, génération des pages restantes et calcul de l'évolution. Le résultat est écrit dans un rapport JSON pour
+comparer les runs entre eux avant un gros événement.
+
+    python bench.py --participants 100 1000 10000 --repeat 3
+
+Avec --check, vérifie seulement que le classement repris du store (cf.
+main.update_score_store) reste identique à un calcul complet quand des
+tentatives disparaissent d'un run à l'autre.
+
+    python bench.py --check
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+import main
+
+CLUBS = ['BVL', 'GDL', 'Les Rousses Pôle Air', 'Vol Libre Jura', 'Parapente 25', '']
+GENDERS = ['Male', 'Female', 'Other', '']
+
+
+def synthetic_attempt(rnd, penalty_rate, penalty_max):
+    """Une tentative (score, penalite) : score positif, ou score nul avec
+    une pénalité (comptée 100 + pénalité par attempt_values) avec la
+    probabilité penalty_rate."""
+    if rnd.random() < penalty_rate:
+        return 0, -rnd.randint(1, penalty_max)
+    return rnd.randint(0, 100), 0
+
+
+def synthetic_scores(participants, attempts=3, penalty_rate=0.2, penalty_max=20,
+                     event_coverage=0.7, bonus_coverage=0.3, seed=0):
+    """ScoreTable synthétique : chaque participant tente chaque épreuve de
+    COURSES avec la probabilité event_coverage (entre 1 et `attempts`
+    tentatives), et a un score déguisement avec la probabilité
+    bonus_coverage."""
+    rnd = random.Random(seed)
+    events = [course['name'] for course in main.COURSES]
+    all_scores = main.ScoreTable()
+    for i in range(participants):
+        name = f"Pilote {i:05d}"
+        tries = []
+        for event in events:
+            if rnd.random() < event_coverage:
+                tries.extend(
+                    (event,) + synthetic_attempt(rnd, penalty_rate, penalty_max)
+                    for _ in range(rnd.randint(1, attempts))
+                )
+        if rnd.random() < bonus_coverage:
+            tries.append((main.BONUS_COURSE['name'], rnd.randint(1, 50), 0))
+        gender, clubname = rnd.choice(GENDERS), rnd.choice(CLUBS)
+        for event, score, penalite in tries:
+            all_scores.add(name, gender, clubname, event, score, penalite)
+    return all_scores
+
+
+def previous_state(df, seed):
+    """État d'évolution d'un run « précédent » (positions mélangées, un
+    dixième des participants absents) pour exercer toutes les branches de
+    compute_evolution."""
+    rnd = random.Random(seed)
+    participants = list(df['Participant'])
+    rnd.shuffle(participants)
+    return {
+        participant: {"baseline_position": position + 1, "arrow": "same", "magnitude": 0}
+        for position, participant in enumerate(participants)
+        if rnd.random() >= 0.1
+    }
+
+
+def without_attempts(all_scores, drop):
+    """Copie de all_scores sans les tentatives (participant, épreuve) pour
+    lesquelles drop renvoie vrai : tentative supprimée sur iOrienteering,
+    page d'épreuve revenue vide, participant retiré."""
+    table = main.ScoreTable()
+    for code, event, score, penalite in zip(all_scores.participant, all_scores.event,
+                                            all_scores.score, all_scores.penalite):
+        participant = all_scores.participants[code]
+        if not drop(participant.name, all_scores.events[event]):
+            table.add(participant.name, participant.gender, participant.clubname,
+                      all_scores.events[event], score, penalite)
+    return table
+
+
+def check_score_store(participants=200, seed=0):
+    """Compare le classement repris du store à compute_ranking après un run
+    de référence, pour chaque cas où des tentatives disparaissent. Lève
+    AssertionError au premier écart."""
+    all_scores = synthetic_scores(participants, seed=seed)
+    first, second = main.COURSES[0]['name'], main.COURSES[1]['name']
+    events = {}
+    for code, event in zip(all_scores.participant, all_scores.event):
+        events.setdefault(all_scores.participants[code].name, set()).add(all_scores.events[event])
+    pilot = next(name for name, tried in events.items() if {first, second} <= tried)
+    cases = {
+        'tentative disparue': lambda name, event: name == pilot and event == first,
+        'épreuve vide': lambda name, event: event == first,
+        'participant disparu': lambda name, event: name == pilot,
+    }
+    for label, drop in cases.items():
+        with contextlib.closing(main.open_results_db(":memory:")) as conn:
+            _, updates, removed = main.update_score_store(main.load_score_store(conn, main.EDITION, 'check'), all_scores)
+            main.save_score_store(conn, main.EDITION, 'check', updates, removed)
+            scores = without_attempts(all_scores, drop)
+            df, updates, removed = main.update_score_store(main.load_score_store(conn, main.EDITION, 'check'), scores)
+        pd.testing.assert_frame_equal(df, main.compute_ranking(scores), check_dtype=False, obj=label)
+        print(f"{label} : ok ({len(updates)} recalculé(s), {len(removed)} retiré(s))")
+
+
+def time_stage(timings, name, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    timings.setdefault(name, []).append(time.perf_counter() - start)
+    return result
+
+
+def run_pipeline(all_scores, state, timings):
+    """Un passage complet du pipeline (hors scraping), chaque étape étant
+    chronométrée dans timings (nom d'étape -> durées en secondes)."""
+    event_index = time_stage(timings, 'event_index', main.build_event_index, all_scores)
+
+    def scoring():
+        attempts = main.scores_long_frame(all_scores)
+        return attempts, main.score_participants(attempts, len(all_scores))
+
+    attempts, scores = time_stage(timings, 'scoring', scoring)
+    df = time_stage(timings, 'dataframe', main.ranking_dataframe, all_scores, attempts, scores)
+    time_stage(timings, 'ranking_json', main.export_ranking_json, df, main.RANKING_JSON_PATH)
+    evolution, _ = time_stage(timings, 'compute_evolution', main.compute_evolution, df, state)
+
+    def event_feeds():
+        rows = None
+        for course in main.COURSES + [main.BONUS_COURSE]:
+            rows = main.build_event_rows(all_scores, event_index, course['name'])
+            main.export_event_json(rows, course['name'])
+        return rows
+
+    bonus_rows = time_stage(timings, 'event_feeds', event_feeds)
+
+    # Pages rendues côté serveur à chaque run (cf. main.run), en un lot
+    pages = [
+        main.event_page(bonus_rows, "classement_epreuve_deguisement_test.html", "Classement — Déguisement (test admin)"),
+        main.pilots_grid_page(df, "pilotes_grille_test.html", "Classement — Pilotes (test sexe)"),
+        main.evolution_page(df, "classement_evolution_test.html", "Classement — Évolution (test)", evolution),
+    ]
+    time_stage(timings, 'render_pages', main.render_pages, pages)
+    return df
+
+
+def summarize(durations):
+    return {
+        'min': min(durations),
+        'median': statistics.median(durations),
+        'max': max(durations),
+    }
+
+
+def benchmark(sizes, repeat, attempts, penalty_rate, penalty_max, event_coverage, bonus_coverage, seed):
+    results = []
+    for size in sizes:
+        all_scores = synthetic_scores(size, attempts, penalty_rate, penalty_max,
+                                      event_coverage, bonus_coverage, seed)
+        state = previous_state(main.compute_ranking(all_scores), seed)
+        timings = {}
+        for _ in range(repeat):
+            # Les générateurs écrivent dans docs/ : on les fait écrire dans un
+            # dossier temporaire plutôt que dans les vraies pages. Un dossier
+            # neuf à chaque passage, sinon les sorties déjà écrites par le
+            # précédent sont reconnues inchangées et plus rien n'est écrit.
+            with tempfile.TemporaryDirectory() as tmp, main.working_directory(tmp):
+                start = time.perf_counter()
+                run_pipeline(all_scores, state, timings)
+                timings.setdefault('total', []).append(time.perf_counter() - start)
+        results.append({
+            'participants': size,
+            'attempts': all_scores.attempt_count,
+            'stages': {name: summarize(durations) for name, durations in timings.items()},
+        })
+        print(f"{size:>7} participants : {results[-1]['stages']['total']['median']:.3f} s (médiane)")
+    return results
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark du pipeline de classement TBV sur données synthétiques.")
+    parser.add_argument("--participants", type=int, nargs="+", default=[100, 1000, 5000],
+                        help="tailles de plateau à mesurer (défaut : 100 1000 5000)")
+    parser.add_argument("--attempts", type=int, default=3, help="nombre maximal de tentatives par épreuve")
+    parser.add_argument("--penalty-rate", type=float, default=0.2,
+                        help="proportion de tentatives à 0 avec pénalité")
+    parser.add_argument("--penalty-max", type=int, default=20, help="pénalité maximale (en points)")
+    parser.add_argument("--event-coverage", type=float, default=0.7,
+                        help="probabilité qu'un participant tente une épreuve donnée")
+    parser.add_argument("--bonus-coverage", type=float, default=0.3,
+                        help="proportion de participants ayant un score déguisement")
+    parser.add_argument("--repeat", type=int, default=3, help="nombre de passages par taille")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--render-workers", type=int, default=main.RENDER_WORKERS,
+                        help=f"processus de rendu des pages (défaut : {main.RENDER_WORKERS})")
+    parser.add_argument("--output", default="bench_report.json", help="rapport JSON (défaut : bench_report.json)")
+    parser.add_argument("--check", action="store_true",
+                        help="vérifie le store de classement (tentatives disparues) au lieu de chronométrer")
+    args = parser.parse_args(argv)
+    if args.check:
+        check_score_store(seed=args.seed)
+        return
+    main.RENDER_WORKERS = args.render_workers
+
+    results = benchmark(args.participants, args.repeat, args.attempts, args.penalty_rate,
+                        args.penalty_max, args.event_coverage, args.bonus_coverage, args.seed)
+    report = {
+        'generated_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'python': sys.version.split()[0],
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'parameters': {
+            'attempts': args.attempts,
+            'penalty_rate': args.penalty_rate,
+            'penalty_max': args.penalty_max,
+            'event_coverage': args.event_coverage,
+            'bonus_coverage': args.bonus_coverage,
+            'repeat': args.repeat,
+            'seed': args.seed,
+            'render_workers': args.render_workers,
+        },
+        'results': results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Rapport écrit dans {args.output}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -1,18 +1,43 @@
+import argparse
+import contextlib
 import datetime
+import functools
+import hashlib
 import json
+import multiprocessing
 import os
+import queue
 import re
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import threading
+import time
 import unicodedata
+import urllib.request
+from array import array
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import jinja2
 import pytz
+from bs4 import BeautifulSoup
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
+import numpy as np
 import pandas as pd
 from webdriver_manager.chrome import ChromeDriverManager
 
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Édition du TBV scrapée par ce script (les résultats sont archivés par
+# édition dans RESULTS_DB_PATH)
+EDITION = 2026
+
 # Épreuves du classement (comptent dans le Score Total / Score Final)
 COURSES = [
     {'url': 'https://www.iorienteering.com/dashboard/results/51894', 'hid': 'PlDVta', 'name': 'Garde les pieds sur terre'},
@@ -36,7 +61,546 @@ PILOTS_TEST_COURSE = {
 }
 
 
-def extract_scores_from_url(url, event_id, event_name, debug_path=None):
+# Métriques du run (durée de chaque étape, lignes par épreuve, mémoire),
+# écrites hors de docs/ pour ne pas déclencher un commit à chaque run : le
+# workflow les publie comme artefact.
+RUN_METRICS_PATH = "run_metrics.json"
+
+
+def results_id(url):
+    """Identifiant d'une page de résultats iOrienteering (dernier segment de
+    l'URL /dashboard/results/<id>)."""
+    return url.rstrip('/').rsplit('/', 1)[-1]
+
+
+class RunMetrics:
+    """Chronométrage des étapes d'un run, pour savoir si un run lent vient
+    d'iOrienteering, du démarrage de Chrome ou de notre propre code.
+
+    Chaque étape cumule son nombre d'appels et sa durée. Une étape exécutée
+    à l'intérieur de `course(id)` (dans le même thread) est aussi détaillée
+    pour cette page iOrienteering."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.started_at = datetime.datetime.now(datetime.timezone.utc)
+        self._start = time.perf_counter()
+        self.stages = {}
+        self.courses = {}
+        self.outputs = {'written': 0, 'unchanged': 0}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextlib.contextmanager
+    def course(self, course_id):
+        previous = getattr(self._local, 'course', None)
+        self._local.course = course_id
+        try:
+            yield
+        finally:
+            self._local.course = previous
+
+    @contextlib.contextmanager
+    def stage(self, name, course=None):
+        course = course or getattr(self._local, 'course', None)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_stage(name, time.perf_counter() - start, course)
+
+    def record_stage(self, name, seconds, course=None):
+        """Ajoute une durée mesurée ailleurs (ex: dans un processus de rendu)."""
+        with self._lock:
+            stage = self.stages.setdefault(name, {'calls': 0, 'seconds': 0.0})
+            stage['calls'] += 1
+            stage['seconds'] += seconds
+            if course:
+                stages = self.courses.setdefault(course, {}).setdefault('stages', {})
+                stages[name] = stages.get(name, 0.0) + seconds
+
+    def record_course(self, course_id, **info):
+        with self._lock:
+            self.courses.setdefault(course_id, {}).update(info)
+
+    def is_partial(self, course_id):
+        """Vrai si le tableau de la page a été lu avant d'être complet."""
+        with self._lock:
+            return bool(self.courses.get(course_id, {}).get('partial'))
+
+    def record_output(self, written):
+        with self._lock:
+            self.outputs['written' if written else 'unchanged'] += 1
+
+    def as_dict(self):
+        report = {
+            'started_at': self.started_at.isoformat(),
+            'wall_time': round(time.perf_counter() - self._start, 3),
+            'stages': {
+                name: {'calls': stage['calls'], 'seconds': round(stage['seconds'], 3)}
+                for name, stage in self.stages.items()
+            },
+            'courses': self.courses,
+            'outputs': self.outputs,
+        }
+        if resource is not None:
+            # ru_maxrss est en Ko sous Linux. "children" ne compte que les
+            # processus fils déjà terminés (chromedriver/Chrome après quit()).
+            report['peak_rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+            report['peak_rss_children_mb'] = round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1)
+        return report
+
+    def save(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.as_dict(), f, ensure_ascii=False, indent=2)
+
+
+METRICS = RunMetrics()
+
+
+# Cache local conservé d'un run à l'autre (le workflow le restaure avec
+# actions/cache) : chemin du chromedriver résolu pour chaque version de Chrome.
+CACHE_DIR = os.environ.get("TBV_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "tbv"))
+CHROMEDRIVER_CACHE_PATH = os.path.join(CACHE_DIR, "chromedriver.json")
+
+# Chromedriver local à utiliser tel quel, sans webdriver-manager ni réseau
+# (mode hors ligne).
+PINNED_CHROMEDRIVER = os.environ.get("TBV_CHROMEDRIVER")
+
+CHROME_BINARIES = ["google-chrome", "google-chrome-stable", "chromium", "chromium-browser"]
+
+_chromedriver_path = None
+_chromedriver_lock = threading.Lock()
+
+
+def detect_chrome_version():
+    """Version du Chrome installé (ex: '126.0.6478.126'), ou None si aucun
+    binaire connu n'est trouvé."""
+    for binary in CHROME_BINARIES:
+        path = shutil.which(binary)
+        if not path:
+            continue
+        try:
+            output = subprocess.run([path, "--version"], capture_output=True, text=True, timeout=10).stdout
+        except Exception:
+            continue
+        match = re.search(r"\d+(\.\d+)+", output)
+        if match:
+            return match.group(0)
+    return None
+
+
+def load_chromedriver_cache(path):
+    if os.path.exists(path):
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return {}
+    return {}
+
+
+def save_chromedriver_cache(path, cache):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False, indent=2)
+
+
+def resolve_chromedriver():
+    """Chemin du chromedriver, résolu une seule fois par process.
+
+    Ordre : binaire imposé par TBV_CHROMEDRIVER (hors ligne), puis cache
+    disque indexé par version de Chrome, puis webdriver-manager (qui vérifie
+    les versions en ligne), et en dernier recours un chromedriver du PATH."""
+    global _chromedriver_path
+    with _chromedriver_lock:
+        if _chromedriver_path is None:
+            _chromedriver_path = _resolve_chromedriver()
+        return _chromedriver_path
+
+
+def _resolve_chromedriver():
+    if PINNED_CHROMEDRIVER:
+        return PINNED_CHROMEDRIVER
+
+    version = detect_chrome_version()
+    cache = load_chromedriver_cache(CHROMEDRIVER_CACHE_PATH)
+    cached = cache.get(version) if version else None
+    if cached and os.path.exists(cached):
+        return cached
+
+    try:
+        path = ChromeDriverManager().install()
+    except Exception as e:
+        path = shutil.which("chromedriver")
+        if path is None:
+            raise
+        print(f"webdriver-manager indisponible ({e}), utilisation de {path}")
+        return path
+
+    if version:
+        cache[version] = path
+        save_chromedriver_cache(CHROMEDRIVER_CACHE_PATH, cache)
+    return path
+
+
+def make_chrome_driver():
+    """Démarre un Chrome headless prêt à charger les pages iOrienteering."""
+    chrome_options = Options()
+    chrome_options.add_argument("--headless=new")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    with METRICS.stage('driver_resolution'):
+        driver_path = resolve_chromedriver()
+    with METRICS.stage('browser_start'):
+        return webdriver.Chrome(service=Service(driver_path), options=chrome_options)
+
+
+class BrowserPool:
+    """Petit pool de navigateurs headless partagés pendant tout un run.
+
+    Chaque démarrage de Chrome coûte plusieurs secondes : plutôt que d'en
+    lancer un par page scrapée, on démarre les navigateurs à la demande (au
+    plus `size`), on les prête aux extracteurs via `session()` puis on les
+    ferme tous à la fin du run. A utiliser comme gestionnaire de contexte :
+
+        with BrowserPool() as pool:
+            extract_scores_from_url(url, hid, name, pool=pool)
+    """
+
+    def __init__(self, size=1):
+        self.size = max(1, size)
+        self._idle = queue.Queue()
+        self._drivers = []
+        # Navigateurs en cours de démarrage (place réservée dans le pool)
+        self._starting = 0
+        self._lock = threading.Lock()
+
+    def _acquire(self):
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                driver = None
+            if driver is not None:
+                return driver
+            # Place réservée sous le verrou, Chrome démarré en dehors : les
+            # premières sessions démarrent leurs navigateurs en parallèle.
+            with self._lock:
+                reserved = len(self._drivers) + self._starting < self.size
+                if reserved:
+                    self._starting += 1
+            if reserved:
+                return self._launch()
+            # Pool plein : on attend qu'un navigateur soit rendu, ou qu'une
+            # place se libère (None : démarrage raté ou navigateur retiré).
+            driver = self._idle.get()
+            if driver is not None:
+                return driver
+
+    def _launch(self):
+        try:
+            driver = make_chrome_driver()
+        except Exception:
+            with self._lock:
+                self._starting -= 1
+            self._idle.put(None)
+            raise
+        with self._lock:
+            self._starting -= 1
+            self._drivers.append(driver)
+        return driver
+
+    @contextlib.contextmanager
+    def session(self):
+        """Prête un navigateur du pool le temps d'un bloc `with`. Un
+        navigateur qui a planté est fermé et retiré du pool plutôt que
+        d'être rendu aux extracteurs suivants."""
+        driver = self._acquire()
+        try:
+            yield driver
+        except Exception:
+            self._discard(driver)
+            raise
+        else:
+            self._idle.put(driver)
+
+    def _discard(self, driver):
+        with self._lock:
+            if driver in self._drivers:
+                self._drivers.remove(driver)
+        self._idle.put(None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def close(self):
+        with self._lock:
+            drivers, self._drivers = self._drivers, []
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+@contextlib.contextmanager
+def browser_session(pool=None):
+    """Navigateur emprunté au pool si fourni, sinon un Chrome dédié fermé en
+    sortie (comportement historique des extracteurs)."""
+    if pool is not None:
+        with pool.session() as driver:
+            yield driver
+        return
+    driver = make_chrome_driver()
+    try:
+        yield driver
+    finally:
+        driver.quit()
+
+
+# Tente d'abord de lire le tableau de résultats en HTTP simple (sans
+# navigateur) ; Selenium n'est utilisé que si le tableau est rendu côté client.
+HTTP_FAST_PATH = os.environ.get("TBV_HTTP_FAST_PATH", "1") != "0"
+HTTP_TIMEOUT = 10
+HTTP_USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) TBV-classement"
+
+RESULTS_TBODY_SELECTOR = "#results_table > tbody"
+
+
+def fetch_table_rows_http(url):
+    """Télécharge la page en HTTP et lit `#results_table > tbody` avec
+    BeautifulSoup. Renvoie les lignes au même format que
+    read_table_rows_selenium (liste de lignes, chaque ligne étant une liste
+    de cellules {'text', 'html'}), ou None si le tableau n'est pas présent
+    dans le HTML servi (rendu côté client : il faut alors un navigateur)."""
+    request = urllib.request.Request(url, headers={"User-Agent": HTTP_USER_AGENT})
+    with urllib.request.urlopen(request, timeout=HTTP_TIMEOUT) as response:
+        charset = response.headers.get_content_charset() or "utf-8"
+        html = response.read().decode(charset, errors="replace")
+
+    tbody = BeautifulSoup(html, "html.parser").select_one(RESULTS_TBODY_SELECTOR)
+    if tbody is None:
+        return None
+    rows = [
+        [
+            # Même normalisation des espaces que WebElement.text
+            {'text': " ".join(td.get_text().split()), 'html': td.decode_contents()}
+            for td in tr.find_all('td')
+        ]
+        for tr in tbody.find_all('tr')
+    ]
+    if not any(rows):
+        return None
+    return rows
+
+
+# Sérialise tout le tableau côté navigateur : un seul aller-retour WebDriver
+# au lieu d'un find_elements par ligne et d'un .text / innerHTML par cellule.
+READ_TABLE_JS = """
+const tbody = document.querySelector(arguments[0]);
+if (!tbody) {
+    return null;
+}
+return Array.from(tbody.querySelectorAll('tr'), tr =>
+    Array.from(tr.querySelectorAll('td'), td => ({
+        text: (td.innerText || '').trim(),
+        html: td.innerHTML,
+    }))
+);
+"""
+
+
+COUNT_ROWS_JS = """
+const tbody = document.querySelector(arguments[0]);
+return tbody ? tbody.querySelectorAll('tr').length : -1;
+"""
+
+# Le tableau est considéré prêt dès que son nombre de lignes n'a pas bougé
+# pendant TABLE_STABLE_WINDOW secondes (TABLE_EMPTY_WINDOW s'il est vide, le
+# temps que les résultats chargés côté client arrivent).
+TABLE_POLL_INTERVAL = 0.25
+TABLE_STABLE_WINDOW = 0.75
+TABLE_EMPTY_WINDOW = 3
+
+# Budget d'attente de chaque page : TABLE_BUDGET_FACTOR fois la plus lente
+# de ses TABLE_BUDGET_HISTORY dernières attentes, borné entre
+# TABLE_WAIT_MIN et TABLE_WAIT_MAX secondes (TABLE_WAIT_MAX sans historique).
+TABLE_WAIT_MIN = 5
+TABLE_WAIT_MAX = 20
+TABLE_BUDGET_FACTOR = 3
+TABLE_BUDGET_HISTORY = 10
+TABLE_BUDGETS_PATH = os.path.join(CACHE_DIR, "table_budgets.json")
+
+
+class TableBudgets:
+    """Durées d'attente du tableau observées lors des runs précédents, page
+    par page, pour adapter le délai maximal d'attente de chacune."""
+
+    def __init__(self, path):
+        self.path = path
+        self.history = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self.history is None:
+            self.history = {}
+            if os.path.exists(self.path):
+                try:
+                    with open(self.path, encoding="utf-8") as f:
+                        self.history = json.load(f)
+                except Exception:
+                    self.history = {}
+
+    def budget(self, course_id):
+        with self._lock:
+            self._load()
+            durations = self.history.get(course_id)
+        if not durations:
+            return TABLE_WAIT_MAX
+        return min(TABLE_WAIT_MAX, max(TABLE_WAIT_MIN, TABLE_BUDGET_FACTOR * max(durations)))
+
+    def record(self, course_id, seconds):
+        with self._lock:
+            self._load()
+            durations = self.history.setdefault(course_id, [])
+            durations.append(round(seconds, 3))
+            del durations[:-TABLE_BUDGET_HISTORY]
+
+    def save(self):
+        with self._lock:
+            if self.history is None:
+                return
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(self.history, f, ensure_ascii=False, indent=2)
+
+
+TABLE_BUDGETS = TableBudgets(TABLE_BUDGETS_PATH)
+
+
+def wait_for_stable_table(driver, timeout):
+    """Attend que `#results_table > tbody` existe et que son nombre de lignes
+    soit stable. Renvoie True si c'est le cas avant `timeout` secondes, False
+    si le tableau est encore en train de se remplir ; lève TimeoutException
+    si le tableau n'est jamais apparu."""
+    start = time.monotonic()
+    last_count, stable_since = None, start
+    while True:
+        count = driver.execute_script(COUNT_ROWS_JS, RESULTS_TBODY_SELECTOR)
+        now = time.monotonic()
+        if count != last_count:
+            last_count, stable_since = count, now
+        elif count >= 0 and now - stable_since >= (TABLE_STABLE_WINDOW if count else TABLE_EMPTY_WINDOW):
+            return True
+        if now - start >= timeout:
+            if last_count < 0:
+                raise TimeoutException(f"{RESULTS_TBODY_SELECTOR} absent après {timeout:.0f} s")
+            return False
+        time.sleep(TABLE_POLL_INTERVAL)
+
+
+def read_table_rows_selenium(driver, course_id=None):
+    """Attend que `#results_table > tbody` soit complètement rempli dans la
+    page chargée par le driver et renvoie ses lignes (cf.
+    fetch_table_rows_http pour le format), lues en un seul execute_script.
+
+    Si le tableau se remplit encore à l'expiration du budget d'attente de la
+    page, les lignes déjà présentes sont renvoyées, mais signalées (console
+    et métriques du run) comme potentiellement incomplètes. L'attente est
+    enregistrée dans tous les cas (y compris si le tableau n'est jamais
+    apparu) : un budget dépassé fait grandir celui des runs suivants au lieu
+    de tronquer le tableau à chaque run."""
+    timeout = TABLE_BUDGETS.budget(course_id)
+    start = time.monotonic()
+    stable = False
+    try:
+        with METRICS.stage('table_wait'):
+            stable = wait_for_stable_table(driver, timeout)
+    finally:
+        elapsed = time.monotonic() - start
+        TABLE_BUDGETS.record(course_id, elapsed if stable else max(elapsed, timeout))
+    with METRICS.stage('table_read'):
+        rows = driver.execute_script(READ_TABLE_JS, RESULTS_TBODY_SELECTOR) or []
+    if not stable:
+        print(f"Attention : tableau de {course_id} encore en chargement après {timeout:.0f} s, "
+              f"résultats possiblement incomplets ({len(rows)} lignes)")
+        METRICS.record_course(course_id, partial=True)
+    return rows
+
+
+class TableSnapshots:
+    """Tableaux bruts enregistrés sur disque (un fichier JSON par page
+    iOrienteering) : `--record DIR` les écrit au fil du scraping,
+    `--replay DIR` les relit à la place du scraping, sans navigateur ni
+    réseau, pour rejouer un run de façon déterministe (benchmarks, profiling
+    de l'agrégation et du rendu)."""
+
+    def __init__(self, directory, replay=False):
+        self.directory = directory
+        self.replay = replay
+
+    def path(self, url):
+        return os.path.join(self.directory, f"{results_id(url)}.json")
+
+    def load(self, url):
+        with open(self.path(url), encoding="utf-8") as f:
+            return json.load(f)['rows']
+
+    def save(self, url, rows):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.path(url), "w", encoding="utf-8") as f:
+            json.dump({'url': url, 'rows': rows}, f, ensure_ascii=False)
+
+
+def fetch_results_table(url, pool=None, snapshots=None):
+    """Lignes du tableau de résultats d'une page iOrienteering : chemin
+    rapide HTTP + BeautifulSoup si possible, sinon chargement de la page dans
+    un navigateur (emprunté au pool s'il est fourni).
+
+    Avec snapshots (TableSnapshots), les lignes sont relues depuis le disque
+    en mode replay, ou enregistrées après lecture sinon."""
+    with METRICS.course(results_id(url)):
+        if snapshots is not None and snapshots.replay:
+            rows, source = snapshots.load(url), 'snapshot'
+        else:
+            rows, source = _fetch_results_table(url, pool)
+            if snapshots is not None:
+                snapshots.save(url, rows)
+        METRICS.record_course(results_id(url), rows=len(rows), source=source)
+        return rows
+
+
+def _fetch_results_table(url, pool):
+    if HTTP_FAST_PATH:
+        try:
+            with METRICS.stage('http_fetch'):
+                rows = fetch_table_rows_http(url)
+        except Exception as e:
+            print(f"Lecture HTTP impossible pour {url}, passage par Selenium : {e}")
+            rows = None
+        if rows is not None:
+            return rows, 'http'
+
+    with browser_session(pool) as driver:
+        with METRICS.stage('page_load'):
+            driver.get(url)
+        return read_table_rows_selenium(driver, results_id(url)), 'selenium'
+
+
+def extract_scores_from_url(url, event_id, event_name, debug_path=None, pool=None, snapshots=None):
     """Récupère les scores d'une épreuve iOrienteering.
 
     event_id / event_name sont fournis explicitement (plutôt que déduits de
@@ -46,79 +610,240 @@ def extract_scores_from_url(url, event_id, event_name, debug_path=None):
     Si debug_path est fourni, un fichier texte est écrit avec le détail brut
     des lignes trouvées dans le tableau de résultats, pour diagnostiquer les
     cas où le format de page diffère (ex: nombre de colonnes différent).
-    """
-    chrome_options = Options()
-    chrome_options.add_argument("--headless=new")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
-    driver.get(url)
 
-    scores = {}
+    Si pool (BrowserPool) est fourni et que la page doit passer par
+    Selenium, elle est chargée dans un navigateur du pool au lieu de démarrer
+    un Chrome dédié. snapshots : cf. fetch_results_table.
+
+    Renvoie une ScoreTable (vide en cas d'erreur).
+    """
+    scores = ScoreTable()
     debug_lines = [] if debug_path else None
     try:
-        wait = WebDriverWait(driver, 20)
-        tbody = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#results_table > tbody")))
-        rows = tbody.find_elements(By.TAG_NAME, 'tr')
-
-        if debug_lines is not None:
-            debug_lines.append(f"URL: {url}")
-            debug_lines.append(f"Nombre de lignes trouvées dans #results_table > tbody : {len(rows)}")
-
-        for i, row in enumerate(rows):
-            cols = row.find_elements(By.TAG_NAME, 'td')
-
-            if debug_lines is not None:
-                debug_lines.append(f"--- Ligne {i} : {len(cols)} colonnes ---")
-                for j, col in enumerate(cols):
-                    debug_lines.append(f"  col[{j}] = {col.get_attribute('innerHTML').strip()!r}")
-
-            if len(cols) > 6:
-                username = cols[1].text.strip()
-                gender = cols[3].text.strip()
-                clubname = cols[2].text.strip()
-                score_text = cols[6].get_attribute('innerHTML').strip()
-
-                if '<b>' in score_text:
-                    # Score principal
-                    main_score = int(score_text.split('<b>')[1].split('</b>')[0])
-
-                    # Pénalité éventuelle (ex: "0 (-2)")
-                    penalite = 0
-                    if '(' in score_text and ')' in score_text:
-                        try:
-                            penalite_str = score_text.split('(')[1].split(')')[0]
-                            penalite = int(penalite_str)
-                        except:
-                            penalite = 0
-
-                    if username not in scores:
-                        scores[username] = {
-                            'gender': gender,
-                            'clubname': clubname,
-                            'scores': {}
-                        }
-
-                    scores[username]['scores'].setdefault(event_name, []).append({
-                        "score": main_score,
-                        "penalite": penalite
-                    })
-
+        rows = fetch_results_table(url, pool, snapshots)
+        with METRICS.stage('row_parsing', course=results_id(url)):
+            parse_score_rows(rows, url, event_name, scores, debug_lines)
     except Exception as e:
         print(f"Erreur sur {url} ({event_id}): {e}")
         if debug_lines is not None:
             debug_lines.append(f"EXCEPTION: {e}")
-    finally:
-        driver.quit()
 
     if debug_path:
-        os.makedirs(os.path.dirname(debug_path), exist_ok=True)
-        with open(debug_path, "w", encoding="utf-8") as f:
-            f.write("\n".join(debug_lines) if debug_lines else "(aucune ligne de debug)")
+        write_if_changed(debug_path, "\n".join(debug_lines) if debug_lines else "(aucune ligne de debug)")
 
     return scores
 
 
+class Participant:
+    """Un participant : nom, sexe et club (ceux de la première épreuve où il
+    apparaît)."""
+    __slots__ = ('name', 'gender', 'clubname')
+
+    def __init__(self, name, gender, clubname):
+        self.name = name
+        self.gender = gender
+        self.clubname = clubname
+
+
+class ScoreTable:
+    """Tentatives d'une ou plusieurs épreuves, stockées en colonnes : une
+    entrée par tentative dans des tableaux d'entiers (participant, event,
+    score, penalite), participants et épreuves étant codés par leur rang
+    dans `participants` / `events`. Pas de dict par tentative : un plateau
+    de plusieurs milliers de participants (ou une saison rejouée) reste
+    compact en mémoire et ne charge pas le ramasse-miettes.
+
+    Les participants sont dans l'ordre de leur première apparition, les
+    tentatives dans l'ordre d'ajout."""
+    __slots__ = ('participants', 'events', 'participant', 'event', 'score', 'penalite',
+                 '_participant_codes', '_event_codes', '_valeurs')
+
+    def __init__(self):
+        self.participants = []
+        self.events = []
+        self.participant = array('i')
+        self.event = array('i')
+        self.score = array('i')
+        self.penalite = array('i')
+        self._participant_codes = {}
+        self._event_codes = {}
+        self._valeurs = None
+
+    def __len__(self):
+        """Nombre de participants."""
+        return len(self.participants)
+
+    @property
+    def attempt_count(self):
+        return len(self.score)
+
+    def get(self, name):
+        """Participant de ce nom, ou None."""
+        code = self._participant_codes.get(name)
+        return None if code is None else self.participants[code]
+
+    def participant_code(self, name, gender, clubname):
+        code = self._participant_codes.get(name)
+        if code is None:
+            code = self._participant_codes[name] = len(self.participants)
+            self.participants.append(Participant(name, gender, clubname))
+        return code
+
+    def event_code(self, event):
+        code = self._event_codes.get(event)
+        if code is None:
+            code = self._event_codes[event] = len(self.events)
+            self.events.append(event)
+        return code
+
+    def add(self, name, gender, clubname, event, score, penalite):
+        """Ajoute une tentative (le sexe et le club ne sont retenus que si le
+        participant est nouveau)."""
+        self.participant.append(self.participant_code(name, gender, clubname))
+        self.event.append(self.event_code(event))
+        self.score.append(score)
+        self.penalite.append(penalite)
+        self._valeurs = None
+
+    def extend(self, other, identities=None):
+        """Ajoute les tentatives d'une autre table, participants rattachés à
+        leur nom canonique (cf. ParticipantIndex)."""
+        identities = identities or ParticipantIndex()
+        participant_map = np.array([
+            self.participant_code(identities.canonical(p.name), p.gender, p.clubname)
+            for p in other.participants
+        ], dtype=np.intc)
+        event_map = np.array([self.event_code(e) for e in other.events], dtype=np.intc)
+        if other.attempt_count:
+            self.participant.frombytes(participant_map[other.column('participant')].tobytes())
+            self.event.frombytes(event_map[other.column('event')].tobytes())
+            self.score.extend(other.score)
+            self.penalite.extend(other.penalite)
+            self._valeurs = None
+
+    def subset(self, names):
+        """Table réduite aux participants donnés (dans l'ordre de cette
+        table) et à leurs tentatives."""
+        codes = np.array(sorted(self._participant_codes[name] for name in names), dtype=np.int64)
+        table = ScoreTable()
+        table.participants = [self.participants[code] for code in codes.tolist()]
+        table._participant_codes = {participant.name: code for code, participant in enumerate(table.participants)}
+        table.events = list(self.events)
+        table._event_codes = dict(self._event_codes)
+        participant = self.column('participant')
+        keep = np.isin(participant, codes)
+        new_codes = np.full(len(self.participants), -1, dtype=np.intc)
+        new_codes[codes] = np.arange(len(codes), dtype=np.intc)
+        table.participant.frombytes(new_codes[participant[keep]].tobytes())
+        for name in ('event', 'score', 'penalite'):
+            getattr(table, name).frombytes(self.column(name)[keep].astype(np.intc).tobytes())
+        return table
+
+    def column(self, name):
+        """Copie numpy (int64) d'une colonne de tentatives."""
+        return np.frombuffer(getattr(self, name), dtype=np.intc).astype(np.int64)
+
+    @property
+    def valeurs(self):
+        """Valeur de chaque tentative (cf. attempt_values), calculée une seule
+        fois par table."""
+        if self._valeurs is None:
+            self._valeurs = attempt_values(self.column('score'), self.column('penalite'))
+        return self._valeurs
+
+    def participant_digests(self):
+        """Empreinte 64 bits de chaque participant (entiers, dans l'ordre de
+        participants) : sexe, club et tentatives (épreuve, score, pénalité)
+        dans l'ordre d'ajout. Les tentatives sont mélangées (cf. _mix64) et
+        cumulées par participant sur les colonnes, sans boucle Python par
+        participant ni par tentative."""
+        count = len(self.participants)
+        if not count:
+            return []
+        event_ids = np.array([_text_hash64(event) for event in self.events], dtype=np.uint64)
+        participant = self.column('participant')
+        order = np.argsort(participant, kind='stable')
+        sizes = np.bincount(participant, minlength=count)
+        starts = np.cumsum(sizes) - sizes
+        # Rang de chaque tentative parmi celles du participant (ordre d'ajout)
+        rank = np.arange(len(order)) - np.repeat(starts, sizes)
+        mixed = _mix64(event_ids[self.column('event')[order]] ^ self.column('score')[order].view(np.uint64))
+        mixed = _mix64(mixed ^ self.column('penalite')[order].view(np.uint64))
+        mixed = _mix64(mixed ^ rank.astype(np.uint64))
+        totals = np.zeros(count, dtype=np.uint64)
+        tried = sizes > 0
+        totals[tried] = np.add.reduceat(mixed, starts[tried])
+        pairs = [(p.gender, p.clubname) for p in self.participants]
+        profiles = {pair: _text_hash64("\x1f".join(pair)) for pair in set(pairs)}
+        profile = np.array([profiles[pair] for pair in pairs], dtype=np.uint64)
+        return _mix64(totals ^ profile).view(np.int64).tolist()
+
+    def digest(self):
+        """Empreinte du contenu de la table (cf. content_hash)."""
+        digest = hashlib.sha256(json.dumps([
+            [[p.name, p.gender, p.clubname] for p in self.participants],
+            self.events,
+        ], ensure_ascii=False).encode("utf-8"))
+        for column in (self.participant, self.event, self.score, self.penalite):
+            digest.update(column.tobytes())
+        return digest.hexdigest()
+
+
+def _text_hash64(text):
+    """Empreinte 64 bits stable (d'un run à l'autre) d'un texte."""
+    return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+
+
+def _mix64(values):
+    """Mélange splitmix64 d'un tableau uint64 (multiplications modulo
+    2**64) : deux entrées proches donnent des sorties sans rapport."""
+    values = (values ^ (values >> np.uint64(30))) * np.uint64(0xbf58476d1ce4e5b9)
+    values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94d049bb133111eb)
+    return values ^ (values >> np.uint64(31))
+
+
+def attempt_values(score, penalite):
+    """Valeur numérique de chaque tentative (tableaux numpy de scores et de
+    pénalités) : le score s'il est positif, 100 + pénalité pour un score nul
+    avec pénalité, 0 sinon."""
+    return np.where(score > 0, score, np.where((score == 0) & (penalite < 0), 100 + penalite, 0))
+
+
+def parse_score_rows(rows, url, event_name, scores, debug_lines=None):
+    """Remplit scores (ScoreTable) à partir des lignes brutes du tableau de
+    résultats d'une épreuve."""
+    if debug_lines is not None:
+        debug_lines.append(f"URL: {url}")
+        debug_lines.append(f"Nombre de lignes trouvées dans #results_table > tbody : {len(rows)}")
+
+    for i, cols in enumerate(rows):
+        if debug_lines is not None:
+            debug_lines.append(f"--- Ligne {i} : {len(cols)} colonnes ---")
+            for j, col in enumerate(cols):
+                debug_lines.append(f"  col[{j}] = {col['html'].strip()!r}")
+
+        if len(cols) > 6:
+            username = cols[1]['text'].strip()
+            gender = cols[3]['text'].strip()
+            clubname = cols[2]['text'].strip()
+            score_text = cols[6]['html'].strip()
+
+            if '<b>' in score_text:
+                # Score principal
+                main_score = int(score_text.split('<b>')[1].split('</b>')[0])
+
+                # Pénalité éventuelle (ex: "0 (-2)")
+                penalite = 0
+                if '(' in score_text and ')' in score_text:
+                    try:
+                        penalite_str = score_text.split('(')[1].split(')')[0]
+                        penalite = int(penalite_str)
+                    except:
+                        penalite = 0
+
+                scores.add(username, gender, clubname, event_name, main_score, penalite)
+
+
 GENDER_HOMME = {'homme', 'male', 'h', 'm'}
 GENDER_FEMME = {'femme', 'female', 'f'}
 
@@ -131,10 +856,12 @@ def is_femme(sexe):
     return str(sexe).strip().lower() in GENDER_FEMME
 
 
+@functools.lru_cache(maxsize=None)
 def normalize_sexe(sexe):
     """Affiche toujours Homme/Femme, quel que soit le libellé renvoyé par
     iOrienteering (Male/Female, H/F, etc.). Tout le reste (Other, vide...)
-    devient 'Non défini'."""
+    devient 'Non défini'. Mis en cache : il n'y a qu'une poignée de
+    libellés différents, appelés pour chaque ligne de chaque page."""
     if is_homme(sexe):
         return 'Homme'
     elif is_femme(sexe):
@@ -143,6 +870,16 @@ def normalize_sexe(sexe):
         return 'Non défini'
 
 
+def normalize_sexe_values(values):
+    """normalize_sexe sur toute une liste/colonne de libellés à la fois."""
+    labels = pd.Series(values, dtype=object).astype(str).str.strip().str.lower()
+    return np.select(
+        [labels.isin(GENDER_HOMME), labels.isin(GENDER_FEMME)],
+        ['Homme', 'Femme'],
+        'Non défini',
+    )
+
+
 def style_sex(row):
     if is_homme(row['Sexe']):
         return ['background-color: #d4edda'] * len(row)
@@ -152,132 +889,133 @@ def style_sex(row):
         return [''] * len(row)
 
 
-def generate_html(df, filename, title):
-    paris_tz = pytz.timezone("Europe/Paris")
-    generation_time = datetime.datetime.now(paris_tz).strftime("%d/%m/%Y %H:%M:%S")
-    os.makedirs("docs", exist_ok=True)
-    filepath = os.path.join("docs", filename)
-
-    event_columns = [
-        'Garde les pieds sur terre',
-        'En avant les checkpoints',
-        'Vise la cible ou bien',
-        'Remonte la pente a patte'
-    ]
+# Gabarits des pages (templates/) : mises en page communes dans layouts/,
+# fragments dans partials/, une page par générateur dans pages/. Compilés
+# une seule fois par processus, puis rendus en flux dans le fichier.
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
 
-    html_string = f"""
-    <html>
-    <head>
-        <title>{title}</title>
-        <link rel="stylesheet" href="https://stackpath.bootstrapcdn.com/bootswatch/4.5.2/sketchy/bootstrap.min.css">
-        <style>
-            .container {{
-                padding-left: 10px;
-                padding-right: 10px;
-            }}
-            table {{
-                width: 100%;
-                margin: 20px 0;
-                border-collapse: collapse;
-            }}
-            th, td {{
-                padding: 8px;
-                text-align: left;
-                border: 1px solid #ddd;
-            }}
-            th {{
-                background-color: #f4f4f4;
-            }}
-            tr:nth-child(even) {{
-                background-color: #f9f9f9;
-            }}
-            tr:hover {{
-                filter: brightness(95%);
-            }}
-            .footer-logos {{
-                margin-top: 20px;
-                display: flex;
-                justify-content: center;
-                align-items: center;
-                gap: 20px;
-            }}
-            .footer-logos img {{
-                height: 120px;
-                auto: width;
-                opacity: 0.9;
-            }}
-        </style>
-        <script>
-            setTimeout(function() {{
-                window.location.reload();
-            }}, 300000);
-        </script>
-    </head>
-    <body>
-        <div>
-            <h1>{title}</h1>
-            <p><small>Généré le {generation_time} (heure de Paris)</small></p>
-            <table class="table table-hover">
-                <thead>
-                    <tr>
-                        <th>Position</th>
-                        <th>Participant</th>
-                        <th>Sexe</th>
-                        <th>Club</th>
-    """
 
-    for event_name in event_columns:
-        html_string += f"<th>{event_name}</th>"
-
-    html_string += """
-                        <th>Score Total</th>
-                        <th>Bonus Déguisement</th>
-                        <th>Score Final</th>
-                        <th>Nombre d'épreuves</th>
-                        <th>Détails La Maltournée - Planoise</th>
-                    </tr>
-                </thead>
-                <tbody>
-    """
+@functools.lru_cache(maxsize=None)
+def sexe_badge(sexe, short=False):
+    """(classe CSS, libellé) du badge de sexe, en version courte (H/F/?)
+    pour la grille pilotes."""
+    if is_homme(sexe):
+        return "badge-homme", "H" if short else "Homme"
+    elif is_femme(sexe):
+        return "badge-femme", "F" if short else "Femme"
+    return "badge-autre", "?" if short else "Non défini"
 
-    for index, row in df.iterrows():
-        row_class = "table-success" if is_homme(row['Sexe']) else "table-info"
-        html_string += f"""
-            <tr class="{row_class}">
-                <td>{index + 1}</td>
-                <td>{row['Participant']}</td>
-                <td>{row['Sexe']}</td>
-                <td>{row['Club']}</td>
-        """
-        for event_name in event_columns:
-            html_string += f"<td>{row.get(event_name, 0)}</td>"
-
-        html_string += f"""
-                <td>{row['Score Total']}</td>
-                <td>{row['Bonus Déguisement']}</td>
-                <td>{row['Score Final']}</td>
-                <td>{row["Nombre d'épreuves"]}</td>
-                <td>{row['Détails La Maltournée - Planoise']}</td>
-            </tr>
-        """
-
-    html_string += """
-                </tbody>
-            </table>
-        </div>
-        <div class="footer">
-            <p>Classement généré par L'établi ludique</p>
-            <div class="footer-logos">
-                <img src="logo_etabli.png" alt="Logo L'Établi Ludique">
-                <img src="logo_bvl.png" alt="Logo Besançon Vol Libre">
-            </div>
-        </div>
-    </body>
-    </html>
-    """
 
-    with open(filepath, "w", encoding="utf-8") as file:
-        file.write(html_string)
+MEDALS = {1: "🥇", 2: "🥈", 3: "🥉"}
+
+
+def rank_label(position, prefix=""):
+    """Médaille pour le podium, sinon la position (préfixée, ex: '#12')."""
+    return MEDALS.get(position) or f"{prefix}{position}"
+
+
+def pos_class(position):
+    return f"pos-{position}" if position in MEDALS else ""
+
+
+@functools.lru_cache(maxsize=None)
+def template_env():
+    env = jinja2.Environment(
+        loader=jinja2.FileSystemLoader(TEMPLATES_DIR),
+        # Pas d'échappement automatique : les cellules d'épreuve contiennent
+        # déjà du HTML (<b>meilleur</b>), comme avant les gabarits.
+        autoescape=False,
+        trim_blocks=True,
+        lstrip_blocks=True,
+        auto_reload=False,
+        undefined=jinja2.StrictUndefined,
+    )
+    env.globals.update(
+        is_homme=is_homme,
+        is_femme=is_femme,
+        sexe_badge=sexe_badge,
+        rank_label=rank_label,
+        pos_class=pos_class,
+        sparkline_svg=sparkline_svg,
+    )
+    return env
+
+
+def page_records(df):
+    """Lignes d'un classement pour les gabarits, avec leur position dans le
+    classement général (index de df : conservé par les filtres hommes/femmes)."""
+    return df.assign(Position=df.index + 1).to_dict('records')
+
+
+def generation_time():
+    """Heure de génération affichée sur les pages (heure de Paris)."""
+    return datetime.datetime.now(pytz.timezone("Europe/Paris")).strftime("%d/%m/%Y %H:%M:%S")
+
+
+# Rendu des pages : chaque page est un travail (fichier, gabarit, titre,
+# contexte) ; render_pages répartit les travaux d'un run sur plusieurs
+# processus (TBV_RENDER_WORKERS, par défaut un par cœur).
+RENDER_WORKERS = int(os.environ.get("TBV_RENDER_WORKERS", "0")) or os.cpu_count() or 1
+# En dessous de ce nombre de lignes (toutes pages confondues), le rendu
+# reste dans le processus principal : lancer les processus coûterait plus
+# cher que le rendu lui-même.
+RENDER_PARALLEL_MIN_ROWS = 2000
+
+# Travaux du lot en cours de rendu. Les processus de rendu sont créés par
+# fork après son affectation : ils en héritent sans copie ni sérialisation
+# et ne reçoivent que l'indice du travail à rendre.
+_render_jobs = []
+
+
+def render_text(template, title, context):
+    """Texte de la page templates/<template>."""
+    context = {'generation_time': generation_time(), **context}
+    return template_env().get_template(template).render(title=title, **context)
+
+
+def _render_job(index):
+    _, template, title, context = _render_jobs[index]
+    start = time.perf_counter()
+    text = render_text(template, title, context)
+    return text, time.perf_counter() - start
+
+
+def render_pages(jobs, workers=None):
+    """Rend chaque travail (fichier, gabarit, titre, contexte) dans
+    docs/<fichier>, en parallèle si le lot est assez gros. Les processus
+    renvoient le texte des pages ; l'écriture (cf. write_if_changed, à
+    l'heure de génération près) reste dans le processus principal."""
+    global _render_jobs
+    workers = RENDER_WORKERS if workers is None else workers
+    sizes = [len(context.get('rows') or ()) for _, _, _, context in jobs]
+    parallel = (workers > 1 and len(jobs) > 1 and sum(sizes) >= RENDER_PARALLEL_MIN_ROWS
+                and "fork" in multiprocessing.get_all_start_methods())
+    # Gabarits compilés avant le fork : les processus en héritent
+    for template in {template for _, template, _, _ in jobs}:
+        template_env().get_template(template)
+
+    _render_jobs = jobs
+    try:
+        if parallel:
+            executor = ProcessPoolExecutor(max_workers=min(workers, len(jobs)),
+                                           mp_context=multiprocessing.get_context("fork"))
+            # Les plus grosses pages d'abord, pour bien répartir la charge
+            order = sorted(range(len(jobs)), key=lambda index: -sizes[index])
+            results = zip(order, executor.map(_render_job, order))
+        else:
+            executor = None
+            results = ((index, _render_job(index)) for index in range(len(jobs)))
+        try:
+            for index, (text, seconds) in results:
+                filename = jobs[index][0]
+                start = time.perf_counter()
+                write_if_changed(os.path.join("docs", filename), text, ignore=GENERATION_TIME_RE)
+                METRICS.record_stage(f"page:{filename}", seconds + time.perf_counter() - start)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+    finally:
+        _render_jobs = []
 
 
 def slugify(text):
@@ -286,803 +1024,163 @@ def slugify(text):
     return text
 
 
-def generate_event_html(rows, filename, title):
-    paris_tz = pytz.timezone("Europe/Paris")
-    generation_time = datetime.datetime.now(paris_tz).strftime("%d/%m/%Y %H:%M:%S")
-    os.makedirs("docs", exist_ok=True)
-    filepath = os.path.join("docs", filename)
-
-    medals = {1: "🥇", 2: "🥈", 3: "🥉"}
-
-    html_string = f"""
-    <html>
-    <head>
-        <title>{title}</title>
-        <meta charset="utf-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <link rel="preconnect" href="https://fonts.googleapis.com">
-        <link href="https://fonts.googleapis.com/css2?family=Poppins:wght@400;600;700&display=swap" rel="stylesheet">
-        <style>
-            * {{
-                box-sizing: border-box;
-            }}
-            body {{
-                margin: 0;
-                font-family: 'Poppins', sans-serif;
-                background: linear-gradient(135deg, #1f2933 0%, #2d3b45 100%);
-                min-height: 100vh;
-                padding: 40px 16px;
-                color: #1f2933;
-            }}
-            .wrapper {{
-                max-width: 860px;
-                margin: 0 auto;
-            }}
-            .header {{
-                text-align: center;
-                margin-bottom: 28px;
-                color: #f5f7fa;
-            }}
-            .header h1 {{
-                margin: 0 0 6px 0;
-                font-weight: 700;
-                font-size: 1.8rem;
-                letter-spacing: 0.5px;
-            }}
-            .header p {{
-                margin: 0;
-                font-size: 0.85rem;
-                opacity: 0.7;
-            }}
-            .card {{
-                background: #ffffff;
-                border-radius: 18px;
-                overflow: hidden;
-                box-shadow: 0 20px 45px rgba(0, 0, 0, 0.25);
-            }}
-            .table-scroll {{
-                overflow-x: auto;
-            }}
-            table {{
-                width: 100%;
-                border-collapse: collapse;
-            }}
-            thead th {{
-                background: #10151a;
-                color: #f5f7fa;
-                text-transform: uppercase;
-                font-size: 0.72rem;
-                letter-spacing: 1px;
-                font-weight: 600;
-                padding: 16px 18px;
-                text-align: left;
-            }}
-            tbody td {{
-                padding: 14px 18px;
-                font-size: 0.95rem;
-                border-bottom: 1px solid #eef1f4;
-            }}
-            tbody tr:last-child td {{
-                border-bottom: none;
-            }}
-            tbody tr:hover {{
-                background: #f6f8fa;
-            }}
-            .rank {{
-                font-weight: 700;
-                width: 60px;
-            }}
-            .pos-1 {{ background: linear-gradient(90deg, #fff8e1, #ffffff); }}
-            .pos-2 {{ background: linear-gradient(90deg, #f3f4f6, #ffffff); }}
-            .pos-3 {{ background: linear-gradient(90deg, #fdece0, #ffffff); }}
-            .badge {{
-                display: inline-block;
-                padding: 3px 10px;
-                border-radius: 999px;
-                font-size: 0.72rem;
-                font-weight: 600;
-            }}
-            .badge-homme {{ background: #e3f2ed; color: #1e7a5f; }}
-            .badge-femme {{ background: #eaf1fb; color: #245c9c; }}
-            .badge-autre {{ background: #f1f1f1; color: #666; }}
-            .score {{
-                font-weight: 700;
-                font-size: 1rem;
-            }}
-            .autres {{
-                color: #9aa5b1;
-                font-size: 0.8rem;
-            }}
-            .footer {{
-                text-align: center;
-                margin-top: 22px;
-                color: #cbd2d9;
-                font-size: 0.75rem;
-            }}
-            .footer-logos {{
-                margin-top: 18px;
-                display: flex;
-                justify-content: center;
-                align-items: center;
-                gap: 24px;
-                background: rgba(255, 255, 255, 0.92);
-                border-radius: 14px;
-                padding: 14px 24px;
-            }}
-            .footer-logos img {{
-                height: 60px;
-                width: auto;
-                opacity: 0.95;
-            }}
-            .footer-logos img.logo-etabli {{
-                height: 100px;
-            }}
-            @media (max-width: 650px) {{
-                body {{ padding: 24px 10px; }}
-                .header h1 {{ font-size: 1.4rem; }}
-                thead th, tbody td {{ padding: 10px 10px; font-size: 0.78rem; white-space: nowrap; }}
-                .footer-logos {{ flex-direction: column; gap: 10px; padding: 12px 18px; }}
-                .footer-logos img.logo-etabli {{ height: 70px; }}
-                .footer-logos img {{ height: 42px; }}
-            }}
-        </style>
-        <script>
-            setTimeout(function() {{
-                window.location.reload();
-            }}, 300000);
-        </script>
-    </head>
-    <body>
-        <div class="wrapper">
-            <div class="header">
-                <h1>{title}</h1>
-                <p>Généré le {generation_time} (heure de Paris)</p>
-            </div>
-            <div class="card">
-                <div class="table-scroll">
-                <table>
-                    <thead>
-                        <tr>
-                            <th>#</th>
-                            <th>Participant</th>
-                            <th>Club</th>
-                            <th>Sexe</th>
-                            <th>Score</th>
-                            <th>Autres tentatives</th>
-                        </tr>
-                    </thead>
-                    <tbody>
-    """
-
-    for index, row in enumerate(rows):
-        position = index + 1
-        pos_class = f"pos-{position}" if position in medals else ""
-        medal = medals.get(position, "")
-        if is_homme(row['Sexe']):
-            badge_class, badge_label = "badge-homme", "Homme"
-        elif is_femme(row['Sexe']):
-            badge_class, badge_label = "badge-femme", "Femme"
-        else:
-            badge_class, badge_label = "badge-autre", "Non défini"
-
-        html_string += f"""
-                        <tr class="{pos_class}">
-                            <td class="rank">{medal or position}</td>
-                            <td>{row['Participant']}</td>
-                            <td>{row['Club']}</td>
-                            <td><span class="badge {badge_class}">{badge_label}</span></td>
-                            <td class="score">{row['Score']}</td>
-                            <td class="autres">{row['Autres']}</td>
-                        </tr>
-        """
-
-    html_string += """
-                    </tbody>
-                </table>
-                </div>
-            </div>
-            <p class="footer">Classement généré par L'établi ludique</p>
-            <div class="footer-logos">
-                <img class="logo-etabli" src="logo_etabli.png" alt="Logo L'Établi Ludique">
-                <img src="logo_bvl.png" alt="Logo Besançon Vol Libre">
-            </div>
-        </div>
-    </body>
-    </html>
-    """
-
-    with open(filepath, "w", encoding="utf-8") as file:
-        file.write(html_string)
+def event_page(rows, filename, title):
+    return (filename, "pages/epreuve.html", title, {'rows': rows})
 
 
-def extract_participants_from_url(url):
+def extract_participants_from_url(url, pool=None, snapshots=None):
     """Récupère juste la liste des participants (nom, club, sexe) d'une page
     iOrienteering, sans exiger qu'ils aient un score enregistré. Utile pour
     une page qui liste les pilotes inscrits plutôt qu'un classement."""
-    chrome_options = Options()
-    chrome_options.add_argument("--headless=new")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
-    driver.get(url)
-
-    participants = []
     try:
-        wait = WebDriverWait(driver, 20)
-        tbody = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#results_table > tbody")))
-        rows = tbody.find_elements(By.TAG_NAME, 'tr')
-
-        for row in rows:
-            cols = row.find_elements(By.TAG_NAME, 'td')
-            if len(cols) > 3:
-                username = cols[1].text.strip()
-                clubname = cols[2].text.strip()
-                gender = cols[3].text.strip()
-                if username:
-                    participants.append({
-                        'Participant': username,
-                        'Club': clubname,
-                        'Sexe': normalize_sexe(gender),
-                    })
+        rows = fetch_results_table(url, pool, snapshots)
     except Exception as e:
         print(f"Erreur sur {url}: {e}")
-    finally:
-        driver.quit()
-    return participants
+        return []
+    with METRICS.stage('row_parsing', course=results_id(url)):
+        return parse_participant_rows(rows)
 
 
-def generate_pilots_html(participants, filename, title):
-    paris_tz = pytz.timezone("Europe/Paris")
-    generation_time = datetime.datetime.now(paris_tz).strftime("%d/%m/%Y %H:%M:%S")
-    os.makedirs("docs", exist_ok=True)
-    filepath = os.path.join("docs", filename)
-
-    html_string = f"""
-    <html>
-    <head>
-        <title>{title}</title>
-        <link rel="stylesheet" href="https://stackpath.bootstrapcdn.com/bootswatch/4.5.2/sketchy/bootstrap.min.css">
-        <style>
-            .container {{
-                padding-left: 10px;
-                padding-right: 10px;
-            }}
-            table {{
-                width: 100%;
-                margin: 20px 0;
-                border-collapse: collapse;
-            }}
-            th, td {{
-                padding: 8px;
-                text-align: left;
-                border: 1px solid #ddd;
-            }}
-            th {{
-                background-color: #f4f4f4;
-            }}
-            tr:nth-child(even) {{
-                background-color: #f9f9f9;
-            }}
-            tr:hover {{
-                filter: brightness(95%);
-            }}
-            .footer-logos {{
-                margin-top: 20px;
-                display: flex;
-                justify-content: center;
-                align-items: center;
-                gap: 20px;
-            }}
-            .footer-logos img {{
-                height: 120px;
-                auto: width;
-                opacity: 0.9;
-            }}
-        </style>
-        <script>
-            setTimeout(function() {{
-                window.location.reload();
-            }}, 300000);
-        </script>
-    </head>
-    <body>
-        <div>
-            <h1>{title}</h1>
-            <p><small>Généré le {generation_time} (heure de Paris)</small></p>
-            <table class="table table-hover">
-                <thead>
-                    <tr>
-                        <th>Participant</th>
-                        <th>Club</th>
-                        <th>Sexe</th>
-                    </tr>
-                </thead>
-                <tbody>
-    """
+def parse_participant_rows(rows):
+    participants = []
+    for cols in rows:
+        if len(cols) > 3:
+            username = cols[1]['text'].strip()
+            clubname = cols[2]['text'].strip()
+            gender = cols[3]['text'].strip()
+            if username:
+                participants.append({
+                    'Participant': username,
+                    'Club': clubname,
+                    'Sexe': normalize_sexe(gender),
+                })
+    return participants
 
-    for p in participants:
-        row_class = "table-success" if is_homme(p['Sexe']) else ("table-info" if is_femme(p['Sexe']) else "")
-        html_string += f"""
-            <tr class="{row_class}">
-                <td>{p['Participant']}</td>
-                <td>{p['Club']}</td>
-                <td>{p['Sexe']}</td>
-            </tr>
-        """
-
-    html_string += """
-                </tbody>
-            </table>
-        </div>
-        <div class="footer">
-            <p>Classement généré par L'établi ludique</p>
-            <div class="footer-logos">
-                <img src="logo_etabli.png" alt="Logo L'Établi Ludique">
-                <img src="logo_bvl.png" alt="Logo Besançon Vol Libre">
-            </div>
-        </div>
-    </body>
-    </html>
-    """
 
-    with open(filepath, "w", encoding="utf-8") as file:
-        file.write(html_string)
+def pilots_page(participants, filename, title):
+    return (filename, "pages/pilotes.html", title, {'rows': participants})
 
 
-def generate_simple_html(df, filename, title):
-    """Classement simplifié (Nom, Club, Sexe, Score Total, Nombre d'épreuves)
-    avec un design plus sobre et moderne que le tableau détaillé."""
-    paris_tz = pytz.timezone("Europe/Paris")
-    generation_time = datetime.datetime.now(paris_tz).strftime("%d/%m/%Y %H:%M:%S")
-    os.makedirs("docs", exist_ok=True)
-    filepath = os.path.join("docs", filename)
-
-    medals = {1: "🥇", 2: "🥈", 3: "🥉"}
-
-    html_string = f"""
-    <html>
-    <head>
-        <title>{title}</title>
-        <meta charset="utf-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <link rel="preconnect" href="https://fonts.googleapis.com">
-        <link href="https://fonts.googleapis.com/css2?family=Poppins:wght@400;600;700&display=swap" rel="stylesheet">
-        <style>
-            * {{
-                box-sizing: border-box;
-            }}
-            body {{
-                margin: 0;
-                font-family: 'Poppins', sans-serif;
-                background: linear-gradient(135deg, #1f2933 0%, #2d3b45 100%);
-                min-height: 100vh;
-                padding: 40px 16px;
-                color: #1f2933;
-            }}
-            .wrapper {{
-                max-width: 820px;
-                margin: 0 auto;
-            }}
-            .header {{
-                text-align: center;
-                margin-bottom: 28px;
-                color: #f5f7fa;
-            }}
-            .header h1 {{
-                margin: 0 0 6px 0;
-                font-weight: 700;
-                font-size: 2rem;
-                letter-spacing: 0.5px;
-            }}
-            .header p {{
-                margin: 0;
-                font-size: 0.85rem;
-                opacity: 0.7;
-            }}
-            .card {{
-                background: #ffffff;
-                border-radius: 18px;
-                overflow: hidden;
-                box-shadow: 0 20px 45px rgba(0, 0, 0, 0.25);
-            }}
-            table {{
-                width: 100%;
-                border-collapse: collapse;
-            }}
-            thead th {{
-                background: #10151a;
-                color: #f5f7fa;
-                text-transform: uppercase;
-                font-size: 0.72rem;
-                letter-spacing: 1px;
-                font-weight: 600;
-                padding: 16px 18px;
-                text-align: left;
-            }}
-            tbody td {{
-                padding: 14px 18px;
-                font-size: 0.95rem;
-                border-bottom: 1px solid #eef1f4;
-            }}
-            tbody tr:last-child td {{
-                border-bottom: none;
-            }}
-            tbody tr:hover {{
-                background: #f6f8fa;
-            }}
-            .rank {{
-                font-weight: 700;
-                width: 60px;
-            }}
-            .pos-1 {{ background: linear-gradient(90deg, #fff8e1, #ffffff); }}
-            .pos-2 {{ background: linear-gradient(90deg, #f3f4f6, #ffffff); }}
-            .pos-3 {{ background: linear-gradient(90deg, #fdece0, #ffffff); }}
-            .badge {{
-                display: inline-block;
-                padding: 3px 10px;
-                border-radius: 999px;
-                font-size: 0.72rem;
-                font-weight: 600;
-            }}
-            .badge-homme {{ background: #e3f2ed; color: #1e7a5f; }}
-            .badge-femme {{ background: #eaf1fb; color: #245c9c; }}
-            .badge-autre {{ background: #f1f1f1; color: #666; }}
-            .score {{
-                font-weight: 700;
-                font-size: 1rem;
-            }}
-            .nb-epreuves {{
-                color: #6b7280;
-                font-size: 0.85rem;
-            }}
-            .footer {{
-                text-align: center;
-                margin-top: 22px;
-                color: #cbd2d9;
-                font-size: 0.75rem;
-            }}
-            .footer-logos {{
-                margin-top: 18px;
-                display: flex;
-                justify-content: center;
-                align-items: center;
-                gap: 24px;
-                background: rgba(255, 255, 255, 0.92);
-                border-radius: 14px;
-                padding: 14px 24px;
-            }}
-            .footer-logos img {{
-                height: 60px;
-                width: auto;
-                opacity: 0.95;
-            }}
-            .footer-logos img.logo-etabli {{
-                height: 100px;
-            }}
-            .table-scroll {{
-                overflow-x: auto;
-            }}
-            @media (max-width: 650px) {{
-                body {{
-                    padding: 24px 10px;
-                }}
-                .header h1 {{
-                    font-size: 1.5rem;
-                }}
-                .header p {{
-                    font-size: 0.75rem;
-                }}
-                .card {{
-                    border-radius: 12px;
-                }}
-                thead th, tbody td {{
-                    padding: 10px 10px;
-                    font-size: 0.78rem;
-                    white-space: nowrap;
-                }}
-                .badge {{
-                    font-size: 0.65rem;
-                    padding: 2px 8px;
-                }}
-                .footer-logos {{
-                    flex-direction: column;
-                    gap: 10px;
-                    padding: 12px 18px;
-                }}
-                .footer-logos img.logo-etabli {{
-                    height: 70px;
-                }}
-                .footer-logos img {{
-                    height: 42px;
-                }}
-            }}
-        </style>
-        <script>
-            setTimeout(function() {{
-                window.location.reload();
-            }}, 300000);
-        </script>
-    </head>
-    <body>
-        <div class="wrapper">
-            <div class="header">
-                <h1>{title}</h1>
-                <p>Généré le {generation_time} (heure de Paris)</p>
-            </div>
-            <div class="card">
-                <div class="table-scroll">
-                <table>
-                    <thead>
-                        <tr>
-                            <th>#</th>
-                            <th>Nom Prénom</th>
-                            <th>Club</th>
-                            <th>Sexe</th>
-                            <th>Score Final</th>
-                            <th>Épreuves</th>
-                        </tr>
-                    </thead>
-                    <tbody>
-    """
+def pilots_grid_page(df, filename, title):
+    """Page grille compacte (cartes carrées) pensée pour afficher une
+    quarantaine de pilotes sans avoir à défiler sur un écran de PC classique,
+    avec leur classement (position, score total, nombre d'épreuves)."""
+    return (filename, "pages/grille.html", title, {'rows': page_records(df)})
+
+
+# Pages officielles du classement : coquilles statiques (templates/shells/)
+# qui affichent côté navigateur un flux JSON compact, écrit à chaque run
+# à la place des pages : ranking.json pour le classement général (les pages
+# hommes/femmes en sont des filtres) et une tranche par épreuve. Les
+# coquilles ne sont réécrites que si le code ou les gabarits changent.
+RANKING_FEED_VERSION = 1
+RANKING_JSON_PATH = "docs/ranking.json"
+# Heure du dernier run, seul fichier réécrit à chaque run : les pages et les
+# flux n'embarquent pas d'horodatage qui changerait à chaque fois.
+LAST_UPDATE_PATH = "docs/last_update.json"
+# Dernier changement de chaque flux (cf. publish_feed), interrogé
+# régulièrement par les pages coquilles pour se mettre à jour sans
+# recharger la page (intervalle en secondes : LIVE_POLL_SECONDS).
+RANKING_DELTA_PATH = "docs/ranking_delta.json"
+LIVE_POLL_SECONDS = 60
+
+
+def event_feed_path(event_name):
+    return f"docs/epreuve_{slugify(event_name)}.json"
+
+
+def shell_pages():
+    """Travaux de rendu (cf. render_pages) des pages coquilles. L'heure
+    affichée est celle de LAST_UPDATE_PATH, lue au chargement."""
+    ranking_feed = os.path.basename(RANKING_JSON_PATH)
+    pages = [
+        ("classement_general.html", "shells/classement.html", "Classement Général",
+         {'feed': ranking_feed, 'filtre': None, 'event_columns': SLOT_COLUMNS}),
+        ("classement_hommes.html", "shells/classement.html", "Classement Hommes",
+         {'feed': ranking_feed, 'filtre': 'Homme', 'event_columns': SLOT_COLUMNS}),
+        ("classement_femmes.html", "shells/classement.html", "Classement Femmes",
+         {'feed': ranking_feed, 'filtre': 'Femme', 'event_columns': SLOT_COLUMNS}),
+        ("classement_simple.html", "shells/simple.html", "Classement Général", {'feed': ranking_feed}),
+        ("pilotes_grille.html", "shells/grille.html", "Classement — Pilotes", {'feed': ranking_feed}),
+    ]
+    for course in COURSES + [BONUS_COURSE]:
+        pages.append((f"classement_epreuve_{slugify(course['name'])}.html", "shells/epreuve.html",
+                      f"Classement — {course['name']}",
+                      {'feed': os.path.basename(event_feed_path(course['name']))}))
+    for _, _, _, context in pages:
+        context.update(generation_time="…", delta=os.path.basename(RANKING_DELTA_PATH),
+                       poll_interval=LIVE_POLL_SECONDS * 1000)
+    return pages
 
-    for index, row in df.iterrows():
-        position = index + 1
-        pos_class = f"pos-{position}" if position in medals else ""
-        medal = medals.get(position, "")
-        if is_homme(row['Sexe']):
-            badge_class, badge_label = "badge-homme", "Homme"
-        elif is_femme(row['Sexe']):
-            badge_class, badge_label = "badge-femme", "Femme"
-        else:
-            badge_class, badge_label = "badge-autre", "Non défini"
-
-        html_string += f"""
-                        <tr class="{pos_class}">
-                            <td class="rank">{medal or position}</td>
-                            <td>{row['Participant']}</td>
-                            <td>{row['Club']}</td>
-                            <td><span class="badge {badge_class}">{badge_label}</span></td>
-                            <td class="score">{row['Score Final']}</td>
-                            <td class="nb-epreuves">{row["Nombre d'épreuves"]}</td>
-                        </tr>
-        """
-
-    html_string += """
-                    </tbody>
-                </table>
-                </div>
-            </div>
-            <p class="footer">Classement généré par L'établi ludique</p>
-            <div class="footer-logos">
-                <img class="logo-etabli" src="logo_etabli.png" alt="Logo L'Établi Ludique">
-                <img src="logo_bvl.png" alt="Logo Besançon Vol Libre">
-            </div>
-        </div>
-    </body>
-    </html>
-    """
 
-    with open(filepath, "w", encoding="utf-8") as file:
-        file.write(html_string)
+def feed_payload(columns, rows, **fields):
+    """Flux versionné : colonnes une fois, puis une liste de valeurs par
+    ligne. Pas d'horodatage (cf. LAST_UPDATE_PATH) : un flux dont les
+    données n'ont pas changé n'est pas réécrit."""
+    return {'version': RANKING_FEED_VERSION, 'edition': EDITION, **fields, 'columns': columns, 'rows': rows}
 
 
-def generate_pilots_grid_html(df, filename, title):
-    """Page grille compacte (cartes carrées) pensée pour afficher une
-    quarantaine de pilotes sans avoir à défiler sur un écran de PC classique,
-    avec leur classement (position, score total, nombre d'épreuves)."""
-    paris_tz = pytz.timezone("Europe/Paris")
-    generation_time = datetime.datetime.now(paris_tz).strftime("%d/%m/%Y %H:%M:%S")
-    os.makedirs("docs", exist_ok=True)
-    filepath = os.path.join("docs", filename)
-
-    medals = {1: "🥇", 2: "🥈", 3: "🥉"}
-
-    html_string = f"""
-    <html>
-    <head>
-        <title>{title}</title>
-        <meta charset="utf-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <link rel="preconnect" href="https://fonts.googleapis.com">
-        <link href="https://fonts.googleapis.com/css2?family=Poppins:wght@400;600;700&display=swap" rel="stylesheet">
-        <style>
-            * {{
-                box-sizing: border-box;
-            }}
-            body {{
-                margin: 0;
-                font-family: 'Poppins', sans-serif;
-                background: linear-gradient(135deg, #1f2933 0%, #2d3b45 100%);
-                min-height: 100vh;
-                padding: 24px 32px;
-                color: #1f2933;
-            }}
-            .header {{
-                text-align: center;
-                margin-bottom: 20px;
-                color: #f5f7fa;
-            }}
-            .header h1 {{
-                margin: 0 0 4px 0;
-                font-weight: 700;
-                font-size: 1.6rem;
-                letter-spacing: 0.5px;
-            }}
-            .header p {{
-                margin: 0;
-                font-size: 0.78rem;
-                opacity: 0.7;
-            }}
-            .grid {{
-                display: grid;
-                grid-template-columns: repeat(auto-fill, minmax(150px, 1fr));
-                gap: 12px;
-                max-width: 1500px;
-                margin: 0 auto;
-            }}
-            .pilot-card {{
-                background: #ffffff;
-                border-radius: 12px;
-                padding: 10px 8px;
-                text-align: center;
-                box-shadow: 0 8px 18px rgba(0, 0, 0, 0.18);
-                aspect-ratio: 1 / 1;
-                display: flex;
-                flex-direction: column;
-                align-items: center;
-                justify-content: center;
-                gap: 4px;
-                position: relative;
-            }}
-            .pilot-card.pos-1 {{ background: linear-gradient(160deg, #fff8e1, #ffffff); }}
-            .pilot-card.pos-2 {{ background: linear-gradient(160deg, #f3f4f6, #ffffff); }}
-            .pilot-card.pos-3 {{ background: linear-gradient(160deg, #fdece0, #ffffff); }}
-            .pilot-rank {{
-                position: absolute;
-                top: 6px;
-                left: 8px;
-                font-size: 0.68rem;
-                font-weight: 700;
-                color: #9aa5b1;
-            }}
-            .pilot-name {{
-                font-weight: 600;
-                font-size: 0.8rem;
-                line-height: 1.15;
-                margin-top: 8px;
-            }}
-            .pilot-club {{
-                font-size: 0.68rem;
-                color: #6b7280;
-                line-height: 1.15;
-            }}
-            .pilot-score {{
-                font-weight: 700;
-                font-size: 0.95rem;
-                color: #10151a;
-            }}
-            .pilot-nb {{
-                font-size: 0.65rem;
-                color: #9aa5b1;
-            }}
-            .badge {{
-                display: inline-block;
-                padding: 1px 8px;
-                border-radius: 999px;
-                font-size: 0.6rem;
-                font-weight: 600;
-            }}
-            .badge-homme {{ background: #e3f2ed; color: #1e7a5f; }}
-            .badge-femme {{ background: #eaf1fb; color: #245c9c; }}
-            .badge-autre {{ background: #f1f1f1; color: #666; }}
-            .footer {{
-                text-align: center;
-                margin-top: 22px;
-                color: #cbd2d9;
-                font-size: 0.75rem;
-            }}
-            .footer-logos {{
-                margin-top: 16px;
-                display: flex;
-                justify-content: center;
-                align-items: center;
-                gap: 24px;
-                background: rgba(255, 255, 255, 0.92);
-                border-radius: 14px;
-                padding: 12px 24px;
-                max-width: 320px;
-                margin-left: auto;
-                margin-right: auto;
-            }}
-            .footer-logos img {{
-                height: 50px;
-                width: auto;
-                opacity: 0.95;
-            }}
-            .footer-logos img.logo-etabli {{
-                height: 80px;
-            }}
-            @media (max-width: 700px) {{
-                body {{
-                    padding: 16px 12px;
-                }}
-                .header h1 {{
-                    font-size: 1.25rem;
-                }}
-                .grid {{
-                    grid-template-columns: repeat(auto-fill, minmax(110px, 1fr));
-                    gap: 8px;
-                }}
-                .pilot-name {{
-                    font-size: 0.72rem;
-                }}
-                .pilot-club, .pilot-nb {{
-                    font-size: 0.6rem;
-                }}
-                .pilot-score {{
-                    font-size: 0.85rem;
-                }}
-                .footer-logos {{
-                    flex-direction: column;
-                    gap: 8px;
-                }}
-                .footer-logos img.logo-etabli {{
-                    height: 60px;
-                }}
-                .footer-logos img {{
-                    height: 36px;
-                }}
-            }}
-        </style>
-        <script>
-            setTimeout(function() {{
-                window.location.reload();
-            }}, 300000);
-        </script>
-    </head>
-    <body>
-        <div class="header">
-            <h1>{title}</h1>
-            <p>Généré le {generation_time} (heure de Paris)</p>
-        </div>
-        <div class="grid">
-    """
+def load_feed(path):
+    """Flux (ou RANKING_DELTA_PATH) publié au run précédent, {} s'il
+    n'existe pas."""
+    if os.path.exists(path):
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            pass
+    return {}
 
-    for index, row in df.iterrows():
-        position = index + 1
-        pos_class = f"pos-{position}" if position in medals else ""
-        medal = medals.get(position, "")
-        if is_homme(row['Sexe']):
-            badge_class, badge_label = "badge-homme", "H"
-        elif is_femme(row['Sexe']):
-            badge_class, badge_label = "badge-femme", "F"
-        else:
-            badge_class, badge_label = "badge-autre", "?"
-
-        html_string += f"""
-            <div class="pilot-card {pos_class}">
-                <div class="pilot-rank">{medal or ('#' + str(position))}</div>
-                <div class="pilot-name">{row['Participant']}</div>
-                <div class="pilot-club">{row['Club']}</div>
-                <span class="badge {badge_class}">{badge_label}</span>
-                <div class="pilot-score">{row['Score Final']} pts</div>
-                <div class="pilot-nb">{row["Nombre d'épreuves"]} épreuve(s)</div>
-            </div>
-        """
-
-    html_string += """
-        </div>
-        <p class="footer">Classement généré par L'établi ludique</p>
-        <div class="footer-logos">
-            <img class="logo-etabli" src="logo_etabli.png" alt="Logo L'Établi Ludique">
-            <img src="logo_bvl.png" alt="Logo Besançon Vol Libre">
-        </div>
-    </body>
-    </html>
-    """
 
-    with open(filepath, "w", encoding="utf-8") as file:
-        file.write(html_string)
+def publish_feed(path, columns, rows, **fields):
+    """Écrit le flux path (cf. feed_payload) avec un numéro de révision
+    incrémenté à chaque changement.
+
+    Chaque changement est aussi publié dans RANKING_DELTA_PATH, pour les
+    pages qui affichent la révision précédente : lignes modifiées ou
+    ajoutées, participants retirés, et nouvel ordre des participants
+    seulement s'il a changé. Les lignes sont identifiées par leur colonne
+    Participant (unique dans chaque flux)."""
+    previous = load_feed(path)
+    base = previous.get('revision', 0)
+    same_columns = previous.get('version') == RANKING_FEED_VERSION and previous.get('columns') == columns
+    key = columns.index('Participant')
+    order = [values[key] for values in rows]
+    changed, removed, previous_order = [], [], None
+    if same_columns:
+        previous_rows = {values[key]: values for values in previous['rows']}
+        previous_order = [values[key] for values in previous['rows']]
+        changed = [values for values in rows if previous_rows.get(values[key]) != values]
+        current = set(order)
+        removed = [participant for participant in previous_rows if participant not in current]
+    if same_columns and not changed and not removed and previous_order == order:
+        METRICS.record_output(False)
+        return
+
+    revision = base + 1
+    write_json_export(path, feed_payload(columns, rows, revision=revision, **fields), compact=True)
+    # Premier flux ou colonnes différentes : pas de base, les pages
+    # rechargent le flux entier
+    delta = load_feed(RANKING_DELTA_PATH)
+    if delta.get('version') != RANKING_FEED_VERSION:
+        delta = {'version': RANKING_FEED_VERSION, 'feeds': {}}
+    delta['feeds'][os.path.basename(path)] = {
+        'base': base if same_columns else None, 'revision': revision,
+        'rows': changed, 'removed': removed, 'order': order if same_columns and order != previous_order else None,
+    }
+    write_json_export(RANKING_DELTA_PATH, delta, compact=True)
+
+
+def export_ranking_json(df, path):
+    """Classement général complet (trié) pour les pages coquilles."""
+    data = df[RANKING_COLUMNS].to_dict('split', index=False)
+    publish_feed(path, data['columns'], data['data'])
+
+
+def export_event_json(rows, event_name):
+    """Tranche d'une épreuve (lignes de build_event_rows, déjà triées)."""
+    values = [[row[column] for column in EVENT_ROW_COLUMNS] for row in rows]
+    publish_feed(event_feed_path(event_name), EVENT_ROW_COLUMNS, values, event=event_name)
 
 
 PREVIOUS_POSITIONS_PATH = "docs/previous_positions_test.json"
@@ -1091,19 +1189,201 @@ PREVIOUS_POSITIONS_PATH = "docs/previous_positions_test.json"
 EVOLUTION_STATE_PATH = "docs/evolution_state_test.json"
 
 
-def load_evolution_state(path):
-    """Charge l'état d'évolution (participant -> {baseline_position, arrow,
-    magnitude}) : la position de référence est celle du dernier changement
-    significatif, pas forcément celle du run précédent."""
-    if os.path.exists(path):
+def load_evolution_state(conn, edition, legacy_path=None):
+    """Charge l'état d'évolution de l'édition depuis la base (participant ->
+    {baseline_position, arrow, magnitude}) : la position de référence est
+    celle du dernier changement significatif, pas forcément celle du run
+    précédent.
+
+    Tant que la base ne contient aucun état pour l'édition, il est repris
+    une fois depuis l'ancien fichier JSON (legacy_path) s'il existe."""
+    state = stored_evolution_state(conn, edition)
+    if state:
+        return state
+    if legacy_path and os.path.exists(legacy_path):
         try:
-            with open(path, encoding="utf-8") as f:
+            with open(legacy_path, encoding="utf-8") as f:
                 return json.load(f)
         except Exception:
             return {}
     return {}
 
 
+# Historique du classement : à chaque régénération, (run, participant,
+# position, score) de tous les participants est ajouté à la fin d'un
+# fichier binaire (jamais réécrit), avec un index des runs (timestamp,
+# première ligne, nombre de lignes) pour retrouver un run par dichotomie sans relire tout
+# l'historique. Les participants sont codés par leur rang dans un fichier
+# de noms, lui aussi en ajout seul.
+RANKING_HISTORY_DIR = f"data/ranking_history_{EDITION}"
+HISTORY_DTYPE = np.dtype([('run', '<i8'), ('participant', '<i4'), ('position', '<i4'), ('score', '<i4')])
+HISTORY_RUN_DTYPE = np.dtype([('timestamp', '<i8'), ('offset', '<i8'), ('count', '<i8')])
+
+# Fenêtres d'évolution affichées sur la page évolution : libellé -> début de
+# la fenêtre (timestamp du run courant -> timestamp de référence).
+EVOLUTION_WINDOWS = {
+    'Dernier run': None,
+    '1 h': lambda now: now - 3600,
+    "Aujourd'hui": lambda now: start_of_day(now),
+}
+# Nombre de runs tracés dans la mini-courbe de chaque pilote
+SPARKLINE_RUNS = 24
+
+
+def start_of_day(timestamp):
+    """Timestamp de minuit (heure de Paris) du jour de `timestamp`."""
+    paris_tz = pytz.timezone("Europe/Paris")
+    day = datetime.datetime.fromtimestamp(timestamp, paris_tz).date()
+    return int(paris_tz.localize(datetime.datetime.combine(day, datetime.time())).timestamp())
+
+
+class RankingHistory:
+    """Série temporelle des positions du classement, en ajout seul."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.rows_path = os.path.join(directory, "rows.bin")
+        self.runs_path = os.path.join(directory, "runs.bin")
+        self.names_path = os.path.join(directory, "participants.json")
+        self.names = []
+        if os.path.exists(self.names_path):
+            with open(self.names_path, encoding="utf-8") as f:
+                self.names = json.load(f)
+        self.codes = {name: code for code, name in enumerate(self.names)}
+
+    @staticmethod
+    def _read(path, dtype):
+        """Contenu d'un fichier binaire, projeté en mémoire (rien n'est lu
+        tant qu'on n'y accède pas), sans l'éventuel enregistrement tronqué
+        d'un run interrompu."""
+        count = os.path.getsize(path) // dtype.itemsize if os.path.exists(path) else 0
+        if count == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r', shape=(count,))
+
+    def runs(self):
+        """Index des runs complets (timestamp, première ligne, nombre de lignes)."""
+        runs = self._read(self.runs_path, HISTORY_RUN_DTYPE)
+        rows = os.path.getsize(self.rows_path) // HISTORY_DTYPE.itemsize if os.path.exists(self.rows_path) else 0
+        return runs[runs['offset'] + runs['count'] <= rows]
+
+    def append(self, timestamp, df):
+        """Ajoute le classement df (trié) comme run `timestamp`, sauf s'il
+        est identique au dernier run enregistré (renvoie alors False). Les
+        lignes sont écrites avant leur entrée d'index : un run interrompu
+        n'est jamais lu, et ses octets sont écrasés par le run suivant."""
+        runs = self.runs()
+        scores = df['Score Final'].to_numpy(dtype=np.int64)
+        if len(runs) and all(name in self.codes for name in df['Participant']):
+            last = self._read(self.rows_path, HISTORY_DTYPE)[runs['offset'][-1]:runs['offset'][-1] + runs['count'][-1]]
+            if (len(last) == len(df) and np.array_equal(last['participant'], self._codes(df))
+                    and np.array_equal(last['score'], scores)):
+                return False
+
+        os.makedirs(self.directory, exist_ok=True)
+        new_names = [name for name in df['Participant'] if name not in self.codes]
+        if new_names:
+            for name in new_names:
+                self.codes[name] = len(self.names)
+                self.names.append(name)
+            write_json_export(self.names_path, self.names)
+
+        offset = int(runs['offset'][-1] + runs['count'][-1]) if len(runs) else 0
+        rows = np.zeros(len(df), dtype=HISTORY_DTYPE)
+        rows['run'] = timestamp
+        rows['participant'] = [self.codes[name] for name in df['Participant']]
+        rows['position'] = np.arange(1, len(df) + 1)
+        rows['score'] = scores
+        self._write_at(self.rows_path, offset * HISTORY_DTYPE.itemsize, rows)
+        self._write_at(self.runs_path, len(runs) * HISTORY_RUN_DTYPE.itemsize,
+                       np.array([(timestamp, offset, len(rows))], dtype=HISTORY_RUN_DTYPE))
+        return True
+
+    @staticmethod
+    def _write_at(path, position, array):
+        """Écrit array à la position donnée (fin des données valides), en
+        coupant ce qui suit."""
+        with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+            f.truncate(position)
+            f.seek(position)
+            array.tofile(f)
+
+    def positions(self, run):
+        """Tableau code participant -> position au run donné (0 si absent)."""
+        run_rows = self._read(self.rows_path, HISTORY_DTYPE)[run['offset']:run['offset'] + run['count']]
+        positions = np.zeros(len(self.names) + 1, dtype=np.int64)
+        positions[run_rows['participant']] = run_rows['position']
+        return positions
+
+    def _codes(self, df):
+        return np.array([self.codes.get(name, len(self.names)) for name in df['Participant']], dtype=np.int64)
+
+    def window_runs(self, now, windows=None):
+        """Run de référence de chaque fenêtre (libellé -> rang du run dans
+        l'index, stable puisque l'historique est en ajout seul ; None sans
+        référence) : le dernier run avant le début de la fenêtre (à
+        défaut le plus ancien), retrouvé par dichotomie sur l'index des
+        runs, ou l'avant-dernier run pour la fenêtre 'Dernier run'. Le
+        dernier run est le classement courant : s'il était déjà en place au
+        début de la fenêtre, il est sa propre référence (aucun mouvement)."""
+        windows = EVOLUTION_WINDOWS if windows is None else windows
+        runs = self.runs()
+        references = {}
+        for label, start in windows.items():
+            if len(runs) < 2:
+                references[label] = None
+                continue
+            if start is None:
+                index = len(runs) - 2
+            else:
+                index = max(int(np.searchsorted(runs['timestamp'], start(now), side='right')) - 1, 0)
+            references[label] = index
+        return references
+
+    def window_evolutions(self, df, now, windows=None):
+        """Évolution de chaque participant de df (classement courant, déjà
+        ajouté comme dernier run) sur chaque fenêtre (cf. window_runs) :
+        libellé -> liste (alignée sur df) du nombre de places gagnées
+        (négatif si perdues), None pour un participant absent au début de
+        la fenêtre."""
+        runs = self.runs()
+        codes = self._codes(df)
+        current = np.arange(1, len(df) + 1)
+        evolutions = {}
+        for label, index in self.window_runs(now, windows).items():
+            if index is None:
+                evolutions[label] = [None] * len(df)
+                continue
+            baseline = self.positions(runs[index])[codes]
+            evolutions[label] = np.where(baseline > 0, baseline - current, 0).tolist()
+            for i in np.flatnonzero(baseline == 0).tolist():
+                evolutions[label][i] = None
+        return evolutions
+
+    def sparklines(self, df, count=SPARKLINE_RUNS):
+        """Positions de chaque participant de df sur les `count` derniers
+        runs (listes alignées sur df ; 0 = absent à ce run)."""
+        runs = self.runs()[-count:]
+        codes = self._codes(df)
+        if not len(runs):
+            return [[] for _ in range(len(df))]
+        return np.stack([self.positions(run)[codes] for run in runs], axis=1).tolist()
+
+
+def sparkline_svg(positions, field_size, width=90, height=22):
+    """Mini-courbe SVG des positions d'un pilote (meilleure place en haut,
+    position field_size en bas). Les runs où il était absent ne sont pas
+    tracés."""
+    points = [(i, p) for i, p in enumerate(positions) if p]
+    if len(points) < 2:
+        return ""
+    step = width / max(len(positions) - 1, 1)
+    scale = (height - 4) / max(field_size - 1, 1)
+    coords = " ".join(f"{i * step:.1f},{2 + (p - 1) * scale:.1f}" for i, p in points)
+    return (f'<svg class="spark" width="{width}" height="{height}" viewBox="0 0 {width} {height}">'
+            f'<polyline points="{coords}" fill="none" stroke="#245c9c" stroke-width="1.5"/></svg>')
+
+
 def compute_evolution(df, state):
     """Calcule l'évolution de chaque participant par rapport à la dernière
     évolution significative connue, et renvoie (evolution_par_participant,
@@ -1111,548 +1391,1211 @@ def compute_evolution(df, state):
     dernier changement significatif, l'évolution affichée reste celle du
     dernier changement (pas de retour à '=' tant que rien de nouveau ne
     s'est produit)."""
-    evolution = {}
-    new_state = {}
-
-    for index, row in df.iterrows():
-        participant = row['Participant']
-        current_position = index + 1
-        prev = state.get(participant)
-
-        if prev is None:
-            # Premier passage : affiché "NOUVEAU" une seule fois, puis se
-            # comporte comme un participant stable à partir de maintenant.
-            evolution[participant] = {"type": "new", "magnitude": 0}
-            new_state[participant] = {
-                "baseline_position": current_position,
-                "arrow": "same",
-                "magnitude": 0,
-            }
-            continue
-
-        baseline_position = prev.get("baseline_position", current_position)
-
-        if current_position == baseline_position:
-            # Rien de nouveau depuis le dernier changement significatif :
-            # on conserve l'évolution précédemment affichée telle quelle.
-            arrow = prev.get("arrow", "same")
-            magnitude = prev.get("magnitude", 0)
-        elif current_position < baseline_position:
-            arrow = "up"
-            magnitude = baseline_position - current_position
-        else:
-            arrow = "down"
-            magnitude = current_position - baseline_position
-
-        evolution[participant] = {"type": arrow, "magnitude": magnitude}
-        new_state[participant] = {
-            "baseline_position": current_position,
-            "arrow": arrow,
-            "magnitude": magnitude,
-        }
-
+    participants = df['Participant'].tolist()
+    positions = np.arange(1, len(participants) + 1)
+    known = np.array([participant in state for participant in participants], dtype=bool)
+    previous = pd.DataFrame.from_records([state.get(participant, {}) for participant in participants],
+                                         columns=['baseline_position', 'arrow', 'magnitude'])
+    # Premier passage : affiché "NOUVEAU" une seule fois, puis se comporte
+    # comme un participant stable (référence = position courante).
+    baseline = previous['baseline_position'].fillna(pd.Series(positions)).to_numpy(dtype=np.int64)
+    moves = positions - baseline
+    # Rien de nouveau depuis le dernier changement significatif : on
+    # conserve l'évolution précédemment affichée telle quelle.
+    arrows = np.select([moves < 0, moves > 0], ["up", "down"], previous['arrow'].fillna("same").to_numpy(dtype=object))
+    magnitudes = np.where(moves != 0, np.abs(moves), previous['magnitude'].fillna(0).to_numpy(dtype=np.int64))
+    types = np.where(known, arrows, "new")
+
+    arrows, magnitudes = arrows.tolist(), magnitudes.tolist()
+    evolution = {
+        participant: {"type": kind, "magnitude": magnitude}
+        for participant, kind, magnitude in zip(participants, types.tolist(), magnitudes)
+    }
+    new_state = {
+        participant: {"baseline_position": position, "arrow": arrow, "magnitude": magnitude}
+        for participant, position, arrow, magnitude in zip(participants, positions.tolist(), arrows, magnitudes)
+    }
     return evolution, new_state
 
 
-def save_evolution_state(path, state):
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(state, f, ensure_ascii=False, indent=2)
-
-
-def generate_evolution_html(df, filename, title, evolution):
+def stored_evolution_state(conn, edition):
+    return {
+        row['participant']: {
+            "baseline_position": row['baseline_position'],
+            "arrow": row['arrow'],
+            "magnitude": row['magnitude'],
+        }
+        for row in conn.execute(
+            "SELECT participant, baseline_position, arrow, magnitude FROM evolution_state WHERE edition = ?",
+            (edition,))
+    }
+
+
+def save_evolution_state(conn, edition, state, export_path=None):
+    """Enregistre le nouvel état d'évolution en une transaction, en
+    n'écrivant que les participants dont l'état a changé (et en supprimant
+    ceux qui ont disparu du classement), puis l'exporte en JSON."""
+    previous_state = stored_evolution_state(conn, edition)
+    changed = [
+        (edition, participant, entry['baseline_position'], entry['arrow'], entry['magnitude'])
+        for participant, entry in state.items()
+        if previous_state.get(participant) != entry
+    ]
+    removed = [(edition, participant) for participant in previous_state if participant not in state]
+    with conn:
+        conn.executemany("""
+            INSERT INTO evolution_state VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (edition, participant) DO UPDATE SET
+                baseline_position = excluded.baseline_position,
+                arrow = excluded.arrow, magnitude = excluded.magnitude
+        """, changed)
+        conn.executemany("DELETE FROM evolution_state WHERE edition = ? AND participant = ?", removed)
+    if export_path:
+        write_json_export(export_path, state)
+
+
+def evolution_page(df, filename, title, evolution, windows=None, sparklines=None):
     """Page de test : classement condensé avec une flèche indiquant la
     dernière évolution significative connue (pas seulement le run
-    précédent)."""
-    paris_tz = pytz.timezone("Europe/Paris")
-    generation_time = datetime.datetime.now(paris_tz).strftime("%d/%m/%Y %H:%M:%S")
-    os.makedirs("docs", exist_ok=True)
-    filepath = os.path.join("docs", filename)
-
-    medals = {1: "🥇", 2: "🥈", 3: "🥉"}
-
-    html_string = f"""
-    <html>
-    <head>
-        <title>{title}</title>
-        <meta charset="utf-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <link rel="preconnect" href="https://fonts.googleapis.com">
-        <link href="https://fonts.googleapis.com/css2?family=Poppins:wght@400;600;700&display=swap" rel="stylesheet">
-        <style>
-            * {{
-                box-sizing: border-box;
-            }}
-            body {{
-                margin: 0;
-                font-family: 'Poppins', sans-serif;
-                background: linear-gradient(135deg, #1f2933 0%, #2d3b45 100%);
-                min-height: 100vh;
-                padding: 40px 16px;
-                color: #1f2933;
-            }}
-            .wrapper {{
-                max-width: 860px;
-                margin: 0 auto;
-            }}
-            .header {{
-                text-align: center;
-                margin-bottom: 28px;
-                color: #f5f7fa;
-            }}
-            .header h1 {{
-                margin: 0 0 6px 0;
-                font-weight: 700;
-                font-size: 2rem;
-                letter-spacing: 0.5px;
-            }}
-            .header p {{
-                margin: 0;
-                font-size: 0.85rem;
-                opacity: 0.7;
-            }}
-            .card {{
-                background: #ffffff;
-                border-radius: 18px;
-                overflow: hidden;
-                box-shadow: 0 20px 45px rgba(0, 0, 0, 0.25);
-            }}
-            .table-scroll {{
-                overflow-x: auto;
-            }}
-            table {{
-                width: 100%;
-                border-collapse: collapse;
-            }}
-            thead th {{
-                background: #10151a;
-                color: #f5f7fa;
-                text-transform: uppercase;
-                font-size: 0.72rem;
-                letter-spacing: 1px;
-                font-weight: 600;
-                padding: 16px 18px;
-                text-align: left;
-            }}
-            tbody td {{
-                padding: 14px 18px;
-                font-size: 0.95rem;
-                border-bottom: 1px solid #eef1f4;
-            }}
-            tbody tr:last-child td {{
-                border-bottom: none;
-            }}
-            tbody tr:hover {{
-                background: #f6f8fa;
-            }}
-            .rank {{
-                font-weight: 700;
-                width: 60px;
-            }}
-            .pos-1 {{ background: linear-gradient(90deg, #fff8e1, #ffffff); }}
-            .pos-2 {{ background: linear-gradient(90deg, #f3f4f6, #ffffff); }}
-            .pos-3 {{ background: linear-gradient(90deg, #fdece0, #ffffff); }}
-            .badge {{
-                display: inline-block;
-                padding: 3px 10px;
-                border-radius: 999px;
-                font-size: 0.72rem;
-                font-weight: 600;
-            }}
-            .badge-homme {{ background: #e3f2ed; color: #1e7a5f; }}
-            .badge-femme {{ background: #eaf1fb; color: #245c9c; }}
-            .badge-autre {{ background: #f1f1f1; color: #666; }}
-            .score {{
-                font-weight: 700;
-                font-size: 1rem;
-            }}
-            .evo {{
-                font-weight: 700;
-                font-size: 0.85rem;
-                display: inline-flex;
-                align-items: center;
-                gap: 4px;
-            }}
-            .evo-up {{ color: #1e9e5a; }}
-            .evo-down {{ color: #d64545; }}
-            .evo-same {{ color: #9aa5b1; }}
-            .evo-new {{
-                color: #245c9c;
-                font-size: 0.68rem;
-                font-weight: 600;
-                background: #eaf1fb;
-                padding: 2px 8px;
-                border-radius: 999px;
-            }}
-            .footer {{
-                text-align: center;
-                margin-top: 22px;
-                color: #cbd2d9;
-                font-size: 0.75rem;
-            }}
-            .footer-logos {{
-                margin-top: 18px;
-                display: flex;
-                justify-content: center;
-                align-items: center;
-                gap: 24px;
-                background: rgba(255, 255, 255, 0.92);
-                border-radius: 14px;
-                padding: 14px 24px;
-            }}
-            .footer-logos img {{
-                height: 60px;
-                width: auto;
-                opacity: 0.95;
-            }}
-            .footer-logos img.logo-etabli {{
-                height: 100px;
-            }}
-            @media (max-width: 650px) {{
-                body {{ padding: 24px 10px; }}
-                .header h1 {{ font-size: 1.5rem; }}
-                thead th, tbody td {{ padding: 10px 10px; font-size: 0.78rem; white-space: nowrap; }}
-                .footer-logos {{ flex-direction: column; gap: 10px; padding: 12px 18px; }}
-                .footer-logos img.logo-etabli {{ height: 70px; }}
-                .footer-logos img {{ height: 42px; }}
-            }}
-        </style>
-        <script>
-            setTimeout(function() {{
-                window.location.reload();
-            }}, 300000);
-        </script>
-    </head>
-    <body>
-        <div class="wrapper">
-            <div class="header">
-                <h1>{title}</h1>
-                <p>Généré le {generation_time} (heure de Paris)</p>
-            </div>
-            <div class="card">
-                <div class="table-scroll">
-                <table>
-                    <thead>
-                        <tr>
-                            <th>#</th>
-                            <th></th>
-                            <th>Nom Prénom</th>
-                            <th>Club</th>
-                            <th>Sexe</th>
-                            <th>Score Final</th>
-                        </tr>
-                    </thead>
-                    <tbody>
-    """
-
-    for index, row in df.iterrows():
-        position = index + 1
-        pos_class = f"pos-{position}" if position in medals else ""
-        medal = medals.get(position, "")
-        if is_homme(row['Sexe']):
-            badge_class, badge_label = "badge-homme", "Homme"
-        elif is_femme(row['Sexe']):
-            badge_class, badge_label = "badge-femme", "Femme"
-        else:
-            badge_class, badge_label = "badge-autre", "Non défini"
-
-        evo = evolution.get(row['Participant'], {"type": "same", "magnitude": 0})
-        if evo["type"] == "new":
-            evo_html = '<span class="evo-new">NOUVEAU</span>'
-        elif evo["type"] == "up":
-            evo_html = f'<span class="evo evo-up">▲ {evo["magnitude"]}</span>'
-        elif evo["type"] == "down":
-            evo_html = f'<span class="evo evo-down">▼ {evo["magnitude"]}</span>'
-        else:
-            evo_html = '<span class="evo evo-same">▬</span>'
-
-        html_string += f"""
-                        <tr class="{pos_class}">
-                            <td class="rank">{medal or position}</td>
-                            <td>{evo_html}</td>
-                            <td>{row['Participant']}</td>
-                            <td>{row['Club']}</td>
-                            <td><span class="badge {badge_class}">{badge_label}</span></td>
-                            <td class="score">{row['Score Final']}</td>
-                        </tr>
-        """
-
-    html_string += """
-                    </tbody>
-                </table>
-                </div>
-            </div>
-            <p class="footer">Classement généré par L'établi ludique — Test évolution</p>
-            <div class="footer-logos">
-                <img class="logo-etabli" src="logo_etabli.png" alt="Logo L'Établi Ludique">
-                <img src="logo_bvl.png" alt="Logo Besançon Vol Libre">
-            </div>
-        </div>
-    </body>
-    </html>
-    """
-
-    with open(filepath, "w", encoding="utf-8") as file:
-        file.write(html_string)
+    précédent), les places gagnées/perdues sur chaque fenêtre de windows
+    (voir RankingHistory.window_evolutions) et la courbe des positions
+    récentes de chaque pilote (sparklines, alignées sur df). Toutes les
+    courbes ont la même échelle : la plus grande position atteinte sur les
+    runs tracés (le plateau a pu être plus grand qu'aujourd'hui)."""
+    spark_scale = max((max(positions) for positions in sparklines or [] if positions), default=len(df))
+    return (filename, "pages/evolution.html", title, {
+        'rows': page_records(df), 'evolution': evolution,
+        'default_evolution': {"type": "same", "magnitude": 0},
+        'windows': windows or {}, 'sparklines': sparklines, 'spark_scale': spark_scale,
+    })
 
 
 GENDER_OVERRIDES_PATH = "docs/gender_overrides.json"
 PILOTS_LISTE_TEST_PATH = "docs/pilotes_liste_test.json"
+DEGUISEMENT_OVERRIDES_PATH = "docs/deguisement_overrides.json"
+DEGUISEMENT_LISTE_TEST_PATH = "docs/deguisement_liste_test.json"
 
+# Surcharges définies manuellement depuis les pages admin : nom de la couche
+# -> (fichier participant -> valeur, colonne surchargée). Chaque couche est
+# chargée une fois par run ; une nouvelle surcharge admin se déclare ici.
+#   - gender_overrides : sexe ('Homme' | 'Femme' | 'Non défini'), pour la
+#     grille pilotes test uniquement ;
+#   - deguisement_overrides : score déguisement (entier), pour la page
+#     déguisement test uniquement (peut ajouter des participants absents
+#     du scraping).
+OVERRIDE_LAYERS = {
+    'gender_overrides': (GENDER_OVERRIDES_PATH, 'Sexe'),
+    'deguisement_overrides': (DEGUISEMENT_OVERRIDES_PATH, 'Score'),
+}
 
-def load_gender_overrides(path):
-    """Charge les surcharges de sexe définies manuellement depuis la page
-    admin (participant -> 'Homme' | 'Femme' | 'Non défini')."""
-    if os.path.exists(path):
+EVENT_ROW_COLUMNS = ['Participant', 'Sexe', 'Club', 'Score', 'Autres']
+
+
+def import_overrides(conn, layer, path):
+    """Importe dans la base le fichier de surcharges écrit par la page admin
+    (participant -> valeur), s'il a changé depuis le dernier import. Seules
+    les surcharges ajoutées, modifiées ou supprimées sont écrites, en une
+    transaction. Un fichier illisible (écriture tronquée...) est ignoré :
+    les dernières surcharges importées restent en vigueur au lieu d'être
+    perdues."""
+    digest = file_hash(path)
+    last = conn.execute("SELECT file_hash FROM override_imports WHERE layer = ?", (layer,)).fetchone()
+    if last is not None and last['file_hash'] == digest:
+        return
+    overrides = {}
+    if digest is not None:
         try:
             with open(path, encoding="utf-8") as f:
-                return json.load(f)
-        except Exception:
-            return {}
-    return {}
-
-
-def apply_gender_overrides(df, overrides):
-    """Renvoie une copie du DataFrame avec le sexe surchargé là où une
-    surcharge manuelle existe pour ce participant."""
+                overrides = json.load(f)
+            if not isinstance(overrides, dict):
+                raise ValueError("un objet participant -> valeur est attendu")
+        except Exception as e:
+            print(f"{path} illisible, dernier import conservé : {e}")
+            return
+
+    wanted = {
+        identity_key(participant): (participant, json.dumps(value, ensure_ascii=False))
+        for participant, value in overrides.items()
+    }
+    current = {
+        row['participant_key']: (row['participant'], row['value'])
+        for row in conn.execute("SELECT participant_key, participant, value FROM overrides WHERE layer = ?", (layer,))
+    }
+    with conn:
+        conn.executemany("""
+            INSERT INTO overrides VALUES (?, ?, ?, ?)
+            ON CONFLICT (layer, participant_key) DO UPDATE SET
+                participant = excluded.participant, value = excluded.value
+        """, [(layer, key, participant, value) for key, (participant, value) in wanted.items()
+              if current.get(key) != (participant, value)])
+        conn.executemany("DELETE FROM overrides WHERE layer = ? AND participant_key = ?",
+                         [(layer, key) for key in current if key not in wanted])
+        conn.execute("""
+            INSERT INTO override_imports VALUES (?, ?, ?)
+            ON CONFLICT (layer) DO UPDATE SET file_hash = excluded.file_hash, imported_at = excluded.imported_at
+        """, (layer, digest, datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')))
+
+
+def imported_overrides(conn, layer):
+    """Dernières valeurs importées d'une couche (participant -> valeur)."""
+    return {
+        row['participant']: json.loads(row['value'])
+        for row in conn.execute("SELECT participant, value FROM overrides WHERE layer = ?", (layer,))
+    }
+
+
+def load_override_layers(conn):
+    """Importe puis renvoie toutes les couches de OVERRIDE_LAYERS (nom ->
+    {participant: valeur}), depuis la base."""
+    layers = {}
+    for name, (path, _) in OVERRIDE_LAYERS.items():
+        import_overrides(conn, name, path)
+        layers[name] = imported_overrides(conn, name)
+    return layers
+
+
+def apply_overrides(frame, overrides, column, identities=None, new_row=None):
+    """Renvoie frame avec la colonne `column` remplacée là où une surcharge
+    existe pour le participant (noms comparés par clé d'identité, cf.
+    ParticipantIndex). Si new_row est donné, les participants surchargés
+    absents de frame sont ajoutés (new_row(participant, valeur) -> ligne).
+
+    Une seule correspondance vectorisée par couche : pas de apply ligne à
+    ligne, et frame n'est pas recopié (seule la colonne surchargée est
+    remplacée)."""
     if not overrides:
-        return df
-    df = df.copy()
-    df['Sexe'] = df.apply(
-        lambda row: overrides.get(row['Participant'], row['Sexe']), axis=1
-    )
-    return df
+        return frame
+    identities = identities or ParticipantIndex()
+    by_key = {identities.key(participant): value for participant, value in overrides.items()}
+    keys = frame['Participant'].map(identities.key)
+    matched = keys.isin(by_key).to_numpy()
+
+    values = frame[column].to_numpy(dtype=object, copy=True)
+    values[matched] = keys[matched].map(by_key).to_numpy(dtype=object)
+    frame = frame.copy(deep=False)
+    frame[column] = pd.Series(values, index=frame.index).infer_objects()
+
+    if new_row is not None:
+        present = set(keys)
+        added = {}
+        for participant, value in overrides.items():
+            key = identities.key(participant)
+            if key not in present and key not in added:
+                added[key] = new_row(identities.canonical(participant), by_key[key])
+        if added:
+            frame = pd.concat([frame, pd.DataFrame(list(added.values()), columns=frame.columns)],
+                              ignore_index=True)
+    return frame
+
+
+def apply_deguisement_overrides(rows, overrides, all_scores, identities=None):
+    """Lignes de la page déguisement test : lignes scrapées + surcharges et
+    ajouts manuels, triées par score."""
+    def new_row(participant, score):
+        data = all_scores.get(participant)
+        return {
+            'Participant': participant,
+            'Sexe': normalize_sexe(data.gender if data else ''),
+            'Club': data.clubname if data else '',
+            'Score': score,
+            'Autres': '',
+        }
+
+    frame = apply_overrides(pd.DataFrame(rows, columns=EVENT_ROW_COLUMNS), overrides, 'Score',
+                            identities, new_row)
+    return frame.sort_values(by='Score', ascending=False, kind='stable').to_dict('records')
 
 
 def export_pilots_liste_json(df, path):
     """Exporte la liste des pilotes (participant, club, sexe calculé) pour
     que la page admin puisse proposer une surcharge sans avoir à re-scraper
     iOrienteering elle-même."""
-    os.makedirs(os.path.dirname(path), exist_ok=True)
     pilotes = [
         {"Participant": row['Participant'], "Club": row['Club'], "Sexe": row['Sexe']}
         for _, row in df.iterrows()
     ]
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(pilotes, f, ensure_ascii=False, indent=2)
+    write_json_export(path, pilotes)
 
 
-DEGUISEMENT_OVERRIDES_PATH = "docs/deguisement_overrides.json"
-DEGUISEMENT_LISTE_TEST_PATH = "docs/deguisement_liste_test.json"
+def export_deguisement_liste_json(rows, path):
+    """Exporte la liste actuelle (scrapée) des scores déguisement pour que
+    la page admin puisse s'y référer sans re-scraper iOrienteering."""
+    write_json_export(path, rows)
+
+
+# Nombre de pages iOrienteering scrapées en parallèle (et donc de navigateurs
+# ouverts en même temps). 1 = scraping séquentiel.
+SCRAPE_WORKERS = int(os.environ.get("TBV_SCRAPE_WORKERS", "4"))
+
+
+# Identité des participants : iOrienteering ne garantit pas la même
+# orthographe d'une page à l'autre ("Jean Dupont " / "jean dupont"). Les
+# noms sont comparés par une clé normalisée (accents, casse, espaces), et
+# docs/participant_aliases.json (nom -> nom canonique) rattache les
+# orthographes vraiment différentes d'un même pilote.
+PARTICIPANT_ALIASES_PATH = "docs/participant_aliases.json"
+
+
+@functools.lru_cache(maxsize=None)
+def identity_key(name):
+    """Clé d'identité d'un nom : sans accents (comme slugify), en
+    minuscules, espaces superflus supprimés."""
+    text = unicodedata.normalize('NFKD', str(name))
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(text.casefold().split())
+
+
+def load_participant_aliases(conn, path=PARTICIPANT_ALIASES_PATH):
+    """Charge la table d'alias (nom tel qu'écrit sur iOrienteering -> nom
+    canonique du participant), importée dans la base comme une couche de
+    surcharges (cf. import_overrides) : un fichier illisible est signalé et
+    la dernière table importée reste en vigueur, au lieu de défusionner
+    tous les pilotes aliasés."""
+    import_overrides(conn, 'participant_aliases', path)
+    return imported_overrides(conn, 'participant_aliases')
+
+
+class ParticipantIndex:
+    """Index clé d'identité -> nom affiché. Le nom affiché est le nom
+    canonique de la table d'alias, sinon la première orthographe
+    rencontrée (dans l'ordre de fusion des épreuves)."""
+
+    def __init__(self, aliases=None):
+        self._aliases = {}
+        self._names = {}
+        for alias, name in (aliases or {}).items():
+            self._aliases[identity_key(alias)] = identity_key(name)
+            self._names.setdefault(identity_key(name), ' '.join(name.split()))
+
+    def key(self, name):
+        key = identity_key(name)
+        return self._aliases.get(key, key)
+
+    def canonical(self, name):
+        """Nom affiché du participant (enregistre cette orthographe s'il
+        n'est pas encore connu)."""
+        return self._names.setdefault(self.key(name), ' '.join(name.split()))
+
+
+def merge_scores(all_scores, scores, identities=None):
+    """Fusionne les scores d'une épreuve (ScoreTable) dans all_scores, sous
+    le nom canonique de chaque participant (cf. ParticipantIndex). Le sexe
+    et le club retenus sont ceux de la première épreuve où le participant
+    apparaît."""
+    all_scores.extend(scores, identities)
+
+
+def merge_pilots(pilotes, identities):
+    """Liste des pilotes sous leur nom canonique, doublons fusionnés (la
+    première ligne rencontrée est gardée)."""
+    merged = {}
+    for pilote in pilotes:
+        name = identities.canonical(pilote['Participant'])
+        merged.setdefault(name, dict(pilote, Participant=name))
+    return list(merged.values())
+
+
+def scrape_stream(pool, max_workers=None, snapshots=None):
+    """Scrape en parallèle toutes les pages iOrienteering du run (épreuves,
+    bonus déguisement et liste des pilotes test) et les produit au fil de
+    l'eau : (course, scores) pour chaque épreuve de COURSES + [BONUS_COURSE],
+    dans cet ordre, puis (PILOTS_TEST_COURSE, pilotes).
+
+    Une épreuve est produite dès qu'elle et toutes les précédentes sont
+    arrivées : fusionnés avec merge_scores au fur et à mesure, les résultats
+    donnent le même all_scores qu'un scraping séquentiel, et le
+    consommateur peut générer la page d'une épreuve pendant que les
+    suivantes sont encore en cours de scraping. Le temps passé à attendre
+    les pages est compté dans l'étape 'scraping'."""
+    max_workers = max(1, max_workers or SCRAPE_WORKERS)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            (course, executor.submit(extract_scores_from_url, course['url'], course['hid'], course['name'],
+                                     pool=pool, snapshots=snapshots))
+            for course in COURSES
+        ]
+        # Épreuve bonus déguisement (ne compte pas dans le nombre d'épreuves,
+        # simplement ajoutée au Score Final)
+        futures.append((BONUS_COURSE, executor.submit(
+            extract_scores_from_url,
+            BONUS_COURSE['url'], BONUS_COURSE['hid'], BONUS_COURSE['name'],
+            debug_path="docs/debug_deguisement.txt", pool=pool, snapshots=snapshots
+        )))
+        futures.append((PILOTS_TEST_COURSE, executor.submit(
+            extract_participants_from_url, PILOTS_TEST_COURSE['url'], pool=pool, snapshots=snapshots
+        )))
+
+        for course, future in futures:
+            with METRICS.stage('scraping'):
+                result = future.result()
+            yield course, result
+
+
+# Épreuves du classement, et colonne du classement général où s'affiche leur
+# meilleur score : La Maltournée et Planoise forment une seule épreuve
+# combinée (meilleur score des deux).
+SOLO_EVENTS = ['Garde les pieds sur terre', 'En avant les checkpoints', 'Vise la cible ou bien']
+COMBINED_EVENT = 'Remonte la pente a patte'
+COMBINED_PARTS = ['LaMaltournée', 'Planoise']
+SLOT_COLUMNS = SOLO_EVENTS + [COMBINED_EVENT]
+# Numéro de colonne (slot) de chaque épreuve ; -1 pour les épreuves hors
+# classement (déguisement).
+EVENT_SLOTS = {event: SLOT_COLUMNS.index(event) for event in SOLO_EVENTS}
+EVENT_SLOTS.update({event: SLOT_COLUMNS.index(COMBINED_EVENT) for event in COMBINED_PARTS})
+# Ordre d'affichage des tentatives d'une épreuve combinée (La Maltournée
+# puis Planoise).
+EVENT_RANK = {course['name']: rank for rank, course in enumerate(COURSES + [BONUS_COURSE])}
+
+RANKING_COLUMNS = [
+    'Participant', 'Sexe', 'Club',
+    'Garde les pieds sur terre', 'En avant les checkpoints',
+    'Vise la cible ou bien', 'Remonte la pente a patte',
+    "Nombre d'épreuves", 'Détails La Maltournée - Planoise',
+    'Bonus Déguisement', 'Score Total', 'Score Final',
+]
 
 
-def load_deguisement_overrides(path):
-    """Charge les ajouts/surcharges manuels de score déguisement définis
-    depuis la page admin (participant -> score entier)."""
-    if os.path.exists(path):
-        try:
-            with open(path, encoding="utf-8") as f:
-                return json.load(f)
-        except Exception:
-            return {}
-    return {}
+def compute_ranking(all_scores):
+    """Classement général (un participant par ligne, trié par Score Final)
+    à partir d'une ScoreTable.
+
+    Le calcul se fait en deux temps : score_participants calcule tous les
+    scores à partir des tentatives au format long (scores_long_frame) par
+    opérations groupby, puis ranking_dataframe met en forme le classement
+    (cellules HTML) et le trie."""
+    attempts = scores_long_frame(all_scores)
+    scores = score_participants(attempts, len(all_scores))
+    return ranking_dataframe(all_scores, attempts, scores)
+
+
+def build_event_index(all_scores, start=0):
+    """Index des épreuves : épreuve -> liste de (code participant, valeurs
+    de ses tentatives), participants dans l'ordre de all_scores. Les valeurs
+    sont celles de all_scores.valeurs, calculées une seule fois par run et
+    partagées avec le classement général (scores_long_frame).
+
+    start : n'indexe que les tentatives ajoutées à partir de ce rang (celles
+    de la dernière épreuve fusionnée, quand l'index est construit au fil du
+    scraping)."""
+    if start >= all_scores.attempt_count:
+        return {}
+    participant = all_scores.column('participant')[start:]
+    event = all_scores.column('event')[start:]
+    order = np.lexsort((participant, event))
+    participant, event = participant[order], event[order]
+    values = all_scores.valeurs[start:][order].tolist()
+    starts = np.flatnonzero(np.r_[True, (participant[1:] != participant[:-1]) | (event[1:] != event[:-1])])
+    ends = np.r_[starts[1:], len(order)].astype(np.int64)
+
+    event_index = {}
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        event_index.setdefault(all_scores.events[event[start]], []).append(
+            (int(participant[start]), values[start:end]))
+    return event_index
+
+
+def scores_long_frame(all_scores):
+    """Toutes les tentatives au format long, une ligne par tentative,
+    regroupées par participant (ordre des tentatives conservé) :
+    participant (code dans all_scores), rank (EVENT_RANK de l'épreuve),
+    slot (EVENT_SLOTS) et valeur (cf. attempt_values). Construit directement
+    depuis les colonnes de la ScoreTable, sans boucle Python par
+    tentative."""
+    ranks = np.array([EVENT_RANK.get(e, len(EVENT_RANK)) for e in all_scores.events], dtype=np.int64)
+    slots = np.array([EVENT_SLOTS.get(e, -1) for e in all_scores.events], dtype=np.int64)
+    participant = all_scores.column('participant')
+    order = np.argsort(participant, kind='stable')
+    event = all_scores.column('event')[order]
+    return pd.DataFrame({
+        'participant': participant[order],
+        'rank': ranks[event],
+        'slot': slots[event],
+        'valeur': all_scores.valeurs[order],
+    })
+
+
+def score_participants(attempts, participant_count):
+    """Scores numériques de chaque participant (index = rang dans
+    all_scores) : meilleure valeur par colonne du classement (NaN si aucune
+    tentative), Nombre d'épreuves, Bonus Déguisement, Score Total et Score
+    Final."""
+    index = pd.RangeIndex(participant_count)
+    ranked = attempts[attempts['slot'] >= 0]
+    best = (
+        ranked.groupby(['participant', 'slot'])['valeur'].max()
+        .unstack()
+        .reindex(index=index, columns=range(len(SLOT_COLUMNS)))
+    )
+    best.columns = SLOT_COLUMNS
+    best_values = best.fillna(0).astype('int64')
+    total_score = best_values.sum(axis=1)
+    num_events = (best_values > 0).sum(axis=1)
+
+    # Bonus déguisement : simple addition au score final, hors classement
+    # des épreuves (ne compte pas dans "Nombre d'épreuves" et n'est pas
+    # multiplié).
+    bonus = (
+        attempts.loc[attempts['rank'] == EVENT_RANK[BONUS_COURSE['name']]]
+        .groupby('participant')['valeur'].max()
+        .reindex(index, fill_value=0)
+        .astype('int64')
+    )
 
+    scores = best
+    scores["Nombre d'épreuves"] = num_events
+    scores['Bonus Déguisement'] = bonus
+    # Score Total affiché = score des épreuves + bonus déguisement
+    scores['Score Total'] = total_score + bonus
+    scores['Score Final'] = total_score * num_events + bonus
+    return scores
 
-def apply_deguisement_overrides(rows, overrides, all_scores):
-    """Fusionne les lignes scrapées avec les surcharges/ajouts manuels.
-    Une surcharge peut modifier le score d'un participant déjà présent, ou
-    ajouter un participant absent du scraping iOrienteering."""
-    if not overrides:
-        return rows
-    rows = [dict(r) for r in rows]
-    existing = {r['Participant']: r for r in rows}
-    for participant, score in overrides.items():
-        if participant in existing:
-            existing[participant]['Score'] = score
-        else:
-            data = all_scores.get(participant, {})
-            rows.append({
-                'Participant': participant,
-                'Sexe': normalize_sexe(data.get('gender', '')),
-                'Club': data.get('clubname', ''),
-                'Score': score,
-                'Autres': '',
-            })
+
+def _joined_values(keys, values):
+    """Pour des lignes regroupées par clé (clés égales consécutives),
+    renvoie (clé de chaque groupe, valeurs du groupe jointes par ', ')."""
+    if len(keys) == 0:
+        return keys, []
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(keys)]
+    strings = list(map(str, values.tolist()))
+    return keys[starts], [', '.join(strings[start:end]) for start, end in zip(starts, ends)]
+
+
+def ranking_dataframe(all_scores, attempts, scores):
+    """Mise en forme du classement à partir des scores numériques (cellules
+    HTML des épreuves, détail La Maltournée - Planoise), trié par Score
+    Final."""
+    if not all_scores:
+        # Aucun résultat nulle part pour l'instant (ex: avant le début d'un
+        # événement) : on génère quand même des pages vides plutôt que de
+        # planter.
+        return pd.DataFrame(columns=RANKING_COLUMNS)
+
+    count = len(all_scores)
+    df = pd.DataFrame({
+        'Participant': [p.name for p in all_scores.participants],
+        'Sexe': normalize_sexe_values([p.gender for p in all_scores.participants]),
+        'Club': [p.clubname for p in all_scores.participants],
+    })
+
+    # Cellule d'une épreuve : "<b>meilleur</b> (autres tentatives)", ou 0 si
+    # le participant ne l'a pas tentée. Tri stable : les tentatives gardent
+    # leur ordre, La Maltournée avant Planoise dans l'épreuve combinée.
+    ranked = attempts[attempts['slot'] >= 0]
+    ranked = ranked.iloc[np.lexsort((ranked['rank'].to_numpy(), ranked['slot'].to_numpy(),
+                                     ranked['participant'].to_numpy()))]
+    group = ranked['participant'].to_numpy() * len(SLOT_COLUMNS) + ranked['slot'].to_numpy()
+    best = ranked.groupby(group)['valeur'].transform('max').to_numpy()
+    others = ranked['valeur'].to_numpy() != best
+    groups, joined = _joined_values(group[others], ranked['valeur'].to_numpy()[others])
+    autres = np.full((count, len(SLOT_COLUMNS)), "", dtype=object)
+    autres[groups // len(SLOT_COLUMNS), groups % len(SLOT_COLUMNS)] = joined
+    for slot_index, slot in enumerate(SLOT_COLUMNS):
+        slot_best = scores[slot].to_numpy()
+        tried = ~np.isnan(slot_best)
+        cells = np.zeros(count, dtype=object)
+        cells[tried] = [
+            f"<b>{int(value)}</b>" + (f" ({others_text})" if others_text else "")
+            for value, others_text in zip(slot_best[tried], autres[tried, slot_index])
+        ]
+        df[slot] = cells
+
+    df["Nombre d'épreuves"] = scores["Nombre d'épreuves"]
+    details = {}
+    for event in COMBINED_PARTS:
+        event_rows = attempts[attempts['rank'] == EVENT_RANK[event]]
+        participants, joined = _joined_values(event_rows['participant'].to_numpy(), event_rows['valeur'].to_numpy())
+        event_details = np.full(count, "[]", dtype=object)
+        event_details[participants] = [f"[{text}]" for text in joined]
+        details[event] = event_details
+    df['Détails La Maltournée - Planoise'] = [
+        f"LaMaltournée: {maltournee} Planoise: {planoise}"
+        for maltournee, planoise in zip(details['LaMaltournée'], details['Planoise'])
+    ]
+    df['Bonus Déguisement'] = scores['Bonus Déguisement']
+    df['Score Total'] = scores['Score Total']
+    df['Score Final'] = scores['Score Final']
+
+    return df.sort_values(by="Score Final", ascending=False).reset_index(drop=True)
+
+
+def build_event_rows(all_scores, event_index, event_name):
+    """Lignes du classement d'une épreuve (meilleur score de chaque
+    participant, autres tentatives à part), triées par score."""
+    rows = []
+    for code, valeurs in event_index.get(event_name, []):
+        participant = all_scores.participants[code]
+        best_score = max(valeurs)
+        autres = [str(v) for v in valeurs if v != best_score]
+        rows.append({
+            'Participant': participant.name,
+            'Sexe': normalize_sexe(participant.gender),
+            'Club': participant.clubname,
+            'Score': best_score,
+            'Autres': ', '.join(autres),
+        })
     rows.sort(key=lambda r: r['Score'], reverse=True)
     return rows
 
 
-def export_deguisement_liste_json(rows, path):
-    """Exporte la liste actuelle (scrapée) des scores déguisement pour que
-    la page admin puisse s'y référer sans re-scraper iOrienteering."""
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(rows, f, ensure_ascii=False, indent=2)
-
+# Agrégats persistés d'un run à l'autre (table score_rows de la base) :
+# pour chaque participant, l'empreinte de ses tentatives (cf.
+# ScoreTable.participant_digests) et sa ligne du classement général déjà
+# calculée. Seuls les participants dont les tentatives, le sexe ou le club
+# ont changé sont recalculés et réécrits ; le store est invalidé quand le
+# code change (les lignes pourraient ne plus être à jour).
+def load_score_store(conn, edition, version):
+    """Lignes du classement général enregistrées par les runs précédents
+    pour l'édition, calculées par la version `version` du code (les autres
+    sont ignorées) : (participant -> empreinte, participant -> ligne). Les
+    deux tables sont assemblées en JSON par SQLite et décodées chacune en
+    un seul appel, sans objet Python par ligne lue."""
+    digests, rows = conn.execute(
+        "SELECT json_group_object(participant, digest), "
+        "'{' || coalesce(group_concat(json_quote(participant) || ':' || row, ','), '') || '}' "
+        "FROM score_rows WHERE edition = ? AND version = ?", (edition, version)).fetchone()
+    return json.loads(digests), json.loads(rows)
+
+
+def save_score_store(conn, edition, version, updates, removed):
+    """Enregistre en une transaction les lignes recalculées (updates,
+    cf. update_score_store) et supprime celles des participants disparus,
+    ainsi que celles calculées par une autre version du code."""
+    with conn:
+        conn.execute("DELETE FROM score_rows WHERE edition = ? AND version != ?", (edition, version))
+        conn.executemany("""
+            INSERT INTO score_rows VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (edition, participant) DO UPDATE SET
+                version = excluded.version, digest = excluded.digest, row = excluded.row
+        """, [
+            (edition, participant, version, digest, json.dumps(row, ensure_ascii=False))
+            for participant, (digest, row) in updates.items()
+        ])
+        conn.executemany("DELETE FROM score_rows WHERE edition = ? AND participant = ?",
+                         [(edition, participant) for participant in removed])
+
+
+def update_score_store(store, all_scores):
+    """Classement général (comme compute_ranking) calculé à partir du store
+    (cf. load_score_store). Tous les participants sont hachés (une tentative
+    disparue ou une épreuve vide change aussi l'empreinte) ; seuls ceux dont
+    l'empreinte a changé sont recalculés. Les autres lignes sont reprises
+    telles quelles du store.
+
+    Renvoie (df, lignes_recalculées, participants_disparus) :
+    lignes_recalculées (participant -> (empreinte, ligne)) et
+    participants_disparus sont à passer à save_score_store."""
+    stored_digests, stored_rows = store
+    names = [participant.name for participant in all_scores.participants]
+    digests = dict(zip(names, all_scores.participant_digests()))
+    changed = [name for name, digest in digests.items() if stored_digests.get(name) != digest]
+    fresh = compute_ranking(all_scores.subset(changed))
+    updates = {
+        participant: (digests[participant], row)
+        for participant, row in zip(fresh['Participant'],
+                                    fresh[RANKING_COLUMNS].to_dict('split', index=False)['data'])
+    }
+    present = set(names)
+    removed = [participant for participant in stored_digests if participant not in present]
+
+    if not all_scores:
+        return pd.DataFrame(columns=RANKING_COLUMNS), updates, removed
+    # Même ordre d'entrée que compute_ranking (ordre de all_scores) avant le
+    # tri, pour que les ex aequo sortent dans le même ordre.
+    rows = [updates[name][1] if name in updates else stored_rows[name] for name in names]
+    df = pd.DataFrame(rows, columns=RANKING_COLUMNS)
+    df = df.sort_values(by="Score Final", ascending=False).reset_index(drop=True)
+    return df, updates, removed
+
+
+# Base SQLite du site (versionnée avec lui). Historique des résultats,
+# toutes éditions confondues : chaque run archive les tentatives scrapées et
+# le classement final de l'édition en cours, ce qui permet les classements
+# multi-éditions, l'historique d'un pilote ou les totaux par club sans
+# re-scraper les anciennes pages iOrienteering. Elle porte aussi l'état
+# conservé d'un run à l'autre (évolution du classement, surcharges admin et
+# table d'alias importées, lignes du classement, empreintes des entrées) :
+# les fichiers JSON correspondants n'en sont que des exports, sauf les
+# fichiers de surcharges et d'alias, importés à chaque run.
+RESULTS_DB_PATH = "data/tbv.sqlite"
+
+RESULTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS attempts (
+    edition INTEGER NOT NULL,
+    event TEXT NOT NULL,
+    participant TEXT NOT NULL,
+    participant_key TEXT NOT NULL,
+    gender TEXT NOT NULL,
+    clubname TEXT NOT NULL,
+    attempt INTEGER NOT NULL,
+    score INTEGER NOT NULL,
+    penalite INTEGER NOT NULL,
+    valeur INTEGER NOT NULL,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    vanished_at TEXT,
+    PRIMARY KEY (edition, event, participant_key, attempt)
+);
+CREATE INDEX IF NOT EXISTS attempts_participant ON attempts (participant_key);
+CREATE INDEX IF NOT EXISTS attempts_event ON attempts (event, edition);
+CREATE INDEX IF NOT EXISTS attempts_first_seen ON attempts (first_seen);
+
+CREATE TABLE IF NOT EXISTS standings (
+    edition INTEGER NOT NULL,
+    participant TEXT NOT NULL,
+    participant_key TEXT NOT NULL,
+    sexe TEXT NOT NULL,
+    clubname TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    score_final INTEGER NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (edition, participant_key)
+);
+CREATE INDEX IF NOT EXISTS standings_participant ON standings (participant_key);
+CREATE INDEX IF NOT EXISTS standings_club ON standings (clubname, edition);
+
+CREATE TABLE IF NOT EXISTS evolution_state (
+    edition INTEGER NOT NULL,
+    participant TEXT NOT NULL,
+    baseline_position INTEGER NOT NULL,
+    arrow TEXT NOT NULL,
+    magnitude INTEGER NOT NULL,
+    PRIMARY KEY (edition, participant)
+);
+
+CREATE TABLE IF NOT EXISTS score_rows (
+    edition INTEGER NOT NULL,
+    participant TEXT NOT NULL,
+    version TEXT NOT NULL,
+    digest INTEGER NOT NULL,
+    row TEXT NOT NULL,
+    PRIMARY KEY (edition, participant)
+);
+
+CREATE TABLE IF NOT EXISTS scrape_hashes (
+    input TEXT PRIMARY KEY,
+    hash TEXT
+);
+
+CREATE TABLE IF NOT EXISTS overrides (
+    layer TEXT NOT NULL,
+    participant_key TEXT NOT NULL,
+    participant TEXT NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (layer, participant_key)
+);
+
+CREATE TABLE IF NOT EXISTS override_imports (
+    layer TEXT PRIMARY KEY,
+    file_hash TEXT,
+    imported_at TEXT NOT NULL
+);
+"""
+
+
+def open_results_db(path):
+    """Ouvre (et crée si besoin) la base SQLite du site : historique des
+    résultats et état conservé d'un run à l'autre (évolution, surcharges
+    admin). Mode WAL : chaque mise à jour est une transaction, un run
+    interrompu en pleine écriture ne perd ni ne corrompt l'état."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(RESULTS_SCHEMA)
+    # Bases créées avant la colonne vanished_at (cf. archive_event)
+    if 'vanished_at' not in {row['name'] for row in conn.execute("PRAGMA table_info(attempts)")}:
+        conn.execute("ALTER TABLE attempts ADD COLUMN vanished_at TEXT")
+    return conn
+
+
+# Heure de génération affichée sur les pages (cf. generation_time) :
+# ignorée pour décider si une page a changé.
+GENERATION_TIME_RE = re.compile(r"\d{2}/\d{2}/\d{4} \d{2}:\d{2}:\d{2}")
+
+
+def write_if_changed(path, text, ignore=None):
+    """Écrit text dans path, sauf si le fichier existant a déjà le même
+    contenu (à ce que matche l'expression `ignore` près, ex: l'heure de
+    génération). Écriture atomique (fichier temporaire puis renommage) :
+    un lecteur ne voit jamais un fichier à moitié écrit. Renvoie True si
+    le fichier a été écrit."""
+    def digest(content):
+        if ignore is not None:
+            content = ignore.sub("", content)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
 
-def calcul_valeur(score_dict):
-    """Convertit un score {score, penalite} en valeur numérique"""
-    score = score_dict["score"]
-    penalite = score_dict["penalite"]
-    if score > 0:
-        return score
-    elif score == 0 and penalite < 0:
-        return 100 + penalite
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            unchanged = digest(f.read()) == digest(text)
+        if unchanged:
+            METRICS.record_output(False)
+            return False
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+    METRICS.record_output(True)
+    return True
+
+
+def write_json_export(path, data, compact=False):
+    """Export JSON (cf. write_if_changed : rien n'est écrit si le contenu
+    n'a pas changé). compact : sans indentation ni espaces (flux lus par
+    les pages)."""
+    if compact:
+        text = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
     else:
+        text = json.dumps(data, ensure_ascii=False, indent=2)
+    return write_if_changed(path, text)
+
+
+def archive_event(conn, all_scores, event, edition, timestamp):
+    """Archive les tentatives d'une épreuve (participants sous leur nom
+    canonique). Une tentative déjà connue garde sa date de première
+    apparition ; celles qui ont disparu d'iOrienteering ne sont pas
+    supprimées mais marquées (vanished_at), et redeviennent visibles si
+    elles réapparaissent. Une page vide (erreur de scraping, épreuve pas
+    commencée) ne touche pas à l'historique.
+
+    iOrienteering n'expose pas d'identifiant de tentative : `attempt` est
+    le rang de la tentative parmi celles du participant sur l'épreuve, dans
+    l'ordre du tableau. Si iOrienteering réordonne ses lignes, la date de
+    première apparition peut passer d'une tentative du participant à une
+    autre."""
+    if event not in all_scores.events:
         return 0
+    mask = all_scores.column('event') == all_scores.events.index(event)
+    participant = all_scores.column('participant')[mask]
+    order = np.argsort(participant, kind='stable')
+    participant = participant[order]
+    # Rang de chaque tentative parmi celles du participant sur l'épreuve
+    first = np.flatnonzero(np.r_[True, participant[1:] != participant[:-1]])
+    attempt = np.arange(len(participant)) - np.repeat(first, np.diff(np.r_[first, len(participant)]))
+    rows = [
+        (edition, event, p.name, identity_key(p.name), p.gender, p.clubname, n, score, penalite, valeur,
+         timestamp, timestamp)
+        for p, n, score, penalite, valeur in zip(
+            (all_scores.participants[code] for code in participant.tolist()),
+            attempt.tolist(),
+            all_scores.column('score')[mask][order].tolist(),
+            all_scores.column('penalite')[mask][order].tolist(),
+            all_scores.valeurs[mask][order].tolist(),
+        )
+    ]
+    with conn:
+        conn.executemany("""
+            INSERT INTO attempts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, NULL)
+            ON CONFLICT (edition, event, participant_key, attempt) DO UPDATE SET
+                participant = excluded.participant, gender = excluded.gender,
+                clubname = excluded.clubname, score = excluded.score,
+                penalite = excluded.penalite, valeur = excluded.valeur,
+                last_seen = excluded.last_seen, vanished_at = NULL
+        """, rows)
+        conn.execute(
+            "UPDATE attempts SET vanished_at = ? "
+            "WHERE edition = ? AND event = ? AND last_seen != ? AND vanished_at IS NULL",
+            (timestamp, edition, event, timestamp),
+        )
+    return len(rows)
+
+
+def archive_standings(conn, df, edition, timestamp):
+    """Remplace le classement final archivé de l'édition par df (classement
+    général trié)."""
+    rows = [
+        (edition, participant, identity_key(participant), sexe, club, position, int(score_final), timestamp)
+        for position, (participant, sexe, club, score_final) in enumerate(
+            zip(df['Participant'], df['Sexe'], df['Club'], df['Score Final']), start=1)
+    ]
+    with conn:
+        conn.execute("DELETE FROM standings WHERE edition = ?", (edition,))
+        conn.executemany("INSERT INTO standings VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+
+def leaderboard(conn, editions=None, limit=None):
+    """Classement multi-éditions : somme des Score Final de chaque pilote
+    sur les éditions demandées (toutes par défaut)."""
+    where, params = _editions_filter(editions)
+    query = f"""
+        SELECT MAX(participant) AS participant, SUM(score_final) AS total,
+               COUNT(*) AS editions, MIN(position) AS best_position
+        FROM standings {where}
+        GROUP BY participant_key
+        ORDER BY total DESC, participant
+    """
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+    return [dict(row) for row in conn.execute(query, params)]
+
+
+def pilot_history(conn, participant):
+    """Historique d'un pilote : classement de chaque édition et tentatives
+    par épreuve (nom comparé par clé d'identité)."""
+    key = identity_key(participant)
+    standings = [dict(row) for row in conn.execute(
+        "SELECT edition, position, score_final, sexe, clubname FROM standings "
+        "WHERE participant_key = ? ORDER BY edition", (key,))]
+    attempts = [dict(row) for row in conn.execute(
+        "SELECT edition, event, attempt, score, penalite, valeur, first_seen FROM attempts "
+        "WHERE participant_key = ? AND vanished_at IS NULL ORDER BY edition, event, attempt", (key,))]
+    return {'participant': participant, 'standings': standings, 'attempts': attempts}
+
+
+def club_totals(conn, editions=None):
+    """Total des Score Final et nombre de pilotes par club et par édition."""
+    where, params = _editions_filter(editions)
+    return [dict(row) for row in conn.execute(f"""
+        SELECT edition, clubname, COUNT(*) AS pilots, SUM(score_final) AS total
+        FROM standings {where}
+        GROUP BY edition, clubname
+        ORDER BY edition, total DESC
+    """, params)]
+
+
+def _editions_filter(editions):
+    if not editions:
+        return "", []
+    return f"WHERE edition IN ({', '.join('?' * len(editions))})", list(editions)
+
+
+def print_season(path, editions=None, participant=None):
+    """Affiche le classement multi-éditions et les totaux par club (ou
+    l'historique d'un pilote) depuis la base d'historique."""
+    conn = open_results_db(path)
+    try:
+        if participant:
+            history = pilot_history(conn, participant)
+            for row in history['standings']:
+                print(f"{row['edition']} : {row['position']}e, {row['score_final']} pts ({row['clubname']})")
+            for row in history['attempts']:
+                print(f"  {row['edition']} {row['event']} #{row['attempt'] + 1} : {row['valeur']}")
+            return
+        for rank, row in enumerate(leaderboard(conn, editions), start=1):
+            print(f"{rank:>4}. {row['participant']} : {row['total']} pts "
+                  f"({row['editions']} édition(s), meilleure place {row['best_position']})")
+        print()
+        for row in club_totals(conn, editions):
+            print(f"{row['edition']} {row['clubname'] or '(sans club)'} : {row['total']} pts, {row['pilots']} pilote(s)")
+    finally:
+        conn.close()
 
 
-def main():
-    all_scores = {}
+# Empreintes des entrées du dernier run ayant régénéré les pages (table
+# scrape_hashes de la base) : si rien n'a changé sur iOrienteering (ni dans
+# les surcharges admin, ni dans ce script), le run s'arrête avant
+# l'agrégation et ne réécrit aucun fichier.
 
-    # Épreuves du classement
-    for course in COURSES:
-        scores = extract_scores_from_url(course['url'], course['hid'], course['name'])
-        for participant, data in scores.items():
-            if participant not in all_scores:
-                all_scores[participant] = {'gender': data['gender'], 'clubname': data['clubname'], 'scores': {}}
-            for event_name, score_list in data['scores'].items():
-                all_scores[participant]['scores'].setdefault(event_name, []).extend(score_list)
 
-    # Épreuve bonus déguisement (ne compte pas dans le nombre d'épreuves,
-    # simplement ajoutée au Score Final)
-    bonus_scores = extract_scores_from_url(
-        BONUS_COURSE['url'], BONUS_COURSE['hid'], BONUS_COURSE['name'],
-        debug_path="docs/debug_deguisement.txt"
-    )
-    for participant, data in bonus_scores.items():
-        if participant not in all_scores:
-            all_scores[participant] = {'gender': data['gender'], 'clubname': data['clubname'], 'scores': {}}
-        for event_name, score_list in data['scores'].items():
-            all_scores[participant]['scores'].setdefault(event_name, []).extend(score_list)
+def course_key(course):
+    """Identifiant stable d'une page iOrienteering (course_hid, ou à défaut
+    l'identifiant de la page de résultats)."""
+    return course.get('hid') or results_id(course['url'])
 
-    final_scores = []
 
-    for participant, data in all_scores.items():
-        row = {
-            'Participant': participant,
-            'Sexe': normalize_sexe(data['gender']),
-            'Club': data['clubname'],
-        }
+def content_hash(data):
+    return hashlib.sha256(json.dumps(data, ensure_ascii=False).encode("utf-8")).hexdigest()
 
-        total_score = 0
-        num_events = 0
-
-        # Solo events
-        for event in ['Garde les pieds sur terre', 'En avant les checkpoints', 'Vise la cible ou bien']:
-            scores = data['scores'].get(event, [])
-            if scores:
-                valeurs = [calcul_valeur(s) for s in scores]
-                best_score = max(valeurs)
-                if best_score > 0:
-                    num_events += 1
-                autres = [str(v) for v in valeurs if v != best_score]
-                row[event] = f"<b>{best_score}</b>" + (f" ({', '.join(autres)})" if autres else "")
-                total_score += best_score
-            else:
-                row[event] = 0
-
-        # Combined event: La Maltournée / Planoise
-        mal_scores = data['scores'].get('LaMaltournée', [])
-        pl_scores = data['scores'].get('Planoise', [])
-        combined_scores = mal_scores + pl_scores
-        if combined_scores:
-            valeurs = [calcul_valeur(s) for s in combined_scores]
-            best_score = max(valeurs)
-            if best_score > 0:
-                num_events += 1
-            autres = [str(v) for v in valeurs if v != best_score]
-            row['Remonte la pente a patte'] = f"<b>{best_score}</b>" + (f" ({', '.join(autres)})" if autres else "")
-            total_score += best_score
-        else:
-            row['Remonte la pente a patte'] = 0
 
-        row['Nombre d\'épreuves'] = num_events
-        row['Détails La Maltournée - Planoise'] = f"LaMaltournée: { [calcul_valeur(s) for s in mal_scores] } Planoise: { [calcul_valeur(s) for s in pl_scores] }"
+def file_hash(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
 
-        # Bonus déguisement : simple addition au score final, hors classement
-        # des épreuves (ne compte pas dans "Nombre d'épreuves" et n'est pas
-        # multiplié).
-        deguisement_scores = data['scores'].get('Déguisement', [])
-        bonus = 0
-        if deguisement_scores:
-            bonus = max(calcul_valeur(s) for s in deguisement_scores)
-        row['Bonus Déguisement'] = bonus
 
-        # Score Total affiché = score des épreuves + bonus déguisement
-        row['Score Total'] = total_score + bonus
+def code_hash():
+    """Empreinte du code qui produit les pages : main.py et les gabarits."""
+    digest = hashlib.sha256()
+    paths = [os.path.abspath(__file__)]
+    for directory, _, files in sorted(os.walk(TEMPLATES_DIR)):
+        paths.extend(os.path.join(directory, name) for name in sorted(files))
+    for path in paths:
+        digest.update(os.path.relpath(path, TEMPLATES_DIR).encode("utf-8"))
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
 
-        row['Score Final'] = total_score * num_events + bonus
 
-        final_scores.append(row)
+def load_scrape_hashes(conn):
+    return {row['input']: row['hash'] for row in conn.execute("SELECT input, hash FROM scrape_hashes")}
 
-    if final_scores:
-        df = pd.DataFrame(final_scores).sort_values(by="Score Final", ascending=False).reset_index(drop=True)
-    else:
-        # Aucun résultat nulle part pour l'instant (ex: avant le début d'un
-        # événement) : on génère quand même des pages vides plutôt que de
-        # planter.
-        df = pd.DataFrame(columns=[
-            'Participant', 'Sexe', 'Club',
-            'Garde les pieds sur terre', 'En avant les checkpoints',
-            'Vise la cible ou bien', 'Remonte la pente a patte',
-            "Nombre d'épreuves", 'Score Total',
-            'Détails La Maltournée - Planoise', 'Bonus Déguisement', 'Score Final',
-        ])
 
-    # Génération des fichiers HTML
-    generate_html(df, "classement_general.html", "Classement Général")
-    generate_html(df[df['Sexe'].apply(is_homme)], "classement_hommes.html", "Classement Hommes")
-    generate_html(df[df['Sexe'].apply(is_femme)], "classement_femmes.html", "Classement Femmes")
-    generate_simple_html(df, "classement_simple.html", "Classement Général")
-    generate_pilots_grid_html(df, "pilotes_grille.html", "Classement — Pilotes")
-
-    # Export pour la page admin (liste des pilotes + sexe calculé actuel)
-    export_pilots_liste_json(df, PILOTS_LISTE_TEST_PATH)
-
-    # Page de test (doublon de la grille pilotes) avec les surcharges de sexe
-    # définies manuellement depuis la page admin. N'affecte QUE cette page
-    # test, pas le classement général ni la grille pilotes officielle.
-    gender_overrides = load_gender_overrides(GENDER_OVERRIDES_PATH)
-    df_overridden = apply_gender_overrides(df, gender_overrides)
-    generate_pilots_grid_html(df_overridden, "pilotes_grille_test.html", "Classement — Pilotes (test sexe)")
-
-    # Page de test : évolution du classement (dernier changement significatif connu)
-    evolution_state = load_evolution_state(EVOLUTION_STATE_PATH)
-    evolution, new_evolution_state = compute_evolution(df, evolution_state)
-    generate_evolution_html(df, "classement_evolution_test.html", "Classement — Évolution (test)", evolution)
-    save_evolution_state(EVOLUTION_STATE_PATH, new_evolution_state)
-
-    # Une page de classement par épreuve individuelle (en plus du classement général)
-    for course in COURSES + [BONUS_COURSE]:
+def save_scrape_hashes(conn, hashes):
+    """Enregistre les empreintes du run en une transaction (seulement
+    celles qui ont changé)."""
+    previous = load_scrape_hashes(conn)
+    changed = [(key, value) for key, value in hashes.items() if key not in previous or previous[key] != value]
+    removed = [(key,) for key in previous if key not in hashes]
+    with conn:
+        conn.executemany("""
+            INSERT INTO scrape_hashes VALUES (?, ?)
+            ON CONFLICT (input) DO UPDATE SET hash = excluded.hash
+        """, changed)
+        conn.executemany("DELETE FROM scrape_hashes WHERE input = ?", removed)
+
+
+@contextlib.contextmanager
+def working_directory(path):
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def prepare_output(directory):
+    """Prépare DIR pour --output : copie des pages et fichiers JSON de docs/
+    (sorties du run et surcharges lus en entrée ; pas les images ni les
+    sous-dossiers) et de data/ (base, historique), sauf si DIR les a déjà,
+    ce qui permet d'y enchaîner plusieurs runs."""
+    docs = os.path.join(directory, "docs")
+    if not os.path.exists(docs):
+        os.makedirs(docs)
+        for entry in os.scandir("docs"):
+            if entry.is_file() and entry.name.endswith((".html", ".json")):
+                shutil.copy2(entry.path, docs)
+    data = os.path.join(directory, "data")
+    if os.path.isdir("data") and not os.path.exists(data):
+        shutil.copytree("data", data)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Génère les pages de classement TBV depuis iOrienteering.")
+    snapshot_group = parser.add_mutually_exclusive_group()
+    snapshot_group.add_argument("--record", metavar="DIR",
+                                help="enregistre le tableau brut de chaque page scrapée dans DIR")
+    snapshot_group.add_argument("--replay", metavar="DIR",
+                                help="rejoue les tableaux enregistrés dans DIR (ni navigateur, ni réseau)")
+    parser.add_argument("--output", metavar="DIR",
+                        help="écrit pages, flux et base dans DIR (copie de docs/ et data/) au lieu du dépôt ; "
+                             "avec --replay, un dossier temporaire par défaut")
+    parser.add_argument("--force", action="store_true",
+                        help="régénère toutes les pages même si aucune entrée n'a changé")
+    parser.add_argument("--season", action="store_true",
+                        help="affiche le classement multi-éditions et les totaux par club (sans scraper)")
+    parser.add_argument("--edition", type=int, action="append", metavar="ANNEE",
+                        help="avec --season : limite aux éditions données (répétable)")
+    parser.add_argument("--pilot", metavar="NOM",
+                        help="affiche l'historique d'un pilote toutes éditions confondues (sans scraper)")
+    args = parser.parse_args(argv)
+
+    if args.season or args.pilot:
+        print_season(RESULTS_DB_PATH, args.edition, args.pilot)
+        return
+
+    snapshots = None
+    if args.record:
+        snapshots = TableSnapshots(os.path.abspath(args.record))
+    elif args.replay:
+        snapshots = TableSnapshots(os.path.abspath(args.replay), replay=True)
+
+    # Navigateurs partagés pour tout le run (au lieu d'un Chrome par page),
+    # un par page scrapée en parallèle. Démarrés à la demande seulement :
+    # aucun Chrome n'est lancé en replay. Un replay travaille sur une base en
+    # mémoire et écrit ses sorties hors du dépôt (--output, ou un dossier
+    # temporaire) : il ne touche ni aux pages publiées ni à data/.
+    METRICS.reset()
+    with contextlib.ExitStack() as stack:
+        output = args.output
+        if output is None and args.replay:
+            output = stack.enter_context(tempfile.TemporaryDirectory(prefix="tbv-replay-"))
+            print(f"Replay : sorties dans {output} (supprimé en fin de run, --output DIR pour les garder).")
+        if output is not None:
+            prepare_output(output)
+            stack.enter_context(working_directory(output))
+        try:
+            with BrowserPool(size=SCRAPE_WORKERS) as pool, \
+                    contextlib.closing(open_results_db(":memory:" if args.replay else RESULTS_DB_PATH)) as conn:
+                run(pool, conn, snapshots=snapshots, force=args.force)
+        finally:
+            TABLE_BUDGETS.save()
+            METRICS.save(RUN_METRICS_PATH)
+
+
+def run(pool, conn, snapshots=None, force=False):
+    """Pipeline du run : chaque épreuve est fusionnée puis son flux JSON
+    écrit dès qu'elle arrive (cf. scrape_stream), pendant que les autres
+    pages sont encore scrapées ; le classement général et les pages qui
+    dépendent de toutes les épreuves sont générés quand la dernière est
+    arrivée. Les pages officielles sont des coquilles (cf. shell_pages).
+    conn : base SQLite du site (cf. open_results_db)."""
+    ranked_courses = COURSES + [BONUS_COURSE]
+    ranking_keys = [course_key(course) for course in ranked_courses]
+
+    hashes = {name: file_hash(path) for name, (path, _) in OVERRIDE_LAYERS.items()}
+    # Empreinte de la table d'alias en vigueur (pas du fichier : un fichier
+    # illisible ne change rien, cf. load_participant_aliases)
+    aliases = load_participant_aliases(conn)
+    hashes['participant_aliases'] = content_hash(aliases)
+    hashes['code'] = code_hash()
+    # Le run de référence des fenêtres d'évolution avance avec l'heure : la
+    # page évolution est aussi à régénérer quand il change, même si le
+    # classement n'a pas bougé.
+    now = int(time.time())
+    history = RankingHistory(RANKING_HISTORY_DIR)
+    hashes['evolution_windows'] = content_hash(history.window_runs(now))
+    previous_hashes = load_scrape_hashes(conn)
+
+    def stale(inputs, *paths):
+        """Une sortie est à régénérer si l'une de ses entrées (ou le code, ou
+        la table d'alias qui touche tous les noms) a changé, ou si l'un de
+        ses fichiers n'existe pas encore."""
+        keys = list(inputs) + ['code', 'participant_aliases']
+        return (force or any(previous_hashes.get(key) != hashes[key] for key in keys)
+                or not all(map(os.path.exists, paths)))
+
+    identities = ParticipantIndex(aliases)
+    # Surcharges admin chargées une seule fois pour tout le run
+    overrides = load_override_layers(conn)
+    all_scores = ScoreTable()
+    event_index = {}
+    regenerated = False
+
+    # Pages à rendre, toutes rendues ensemble à la fin (cf. render_pages)
+    pages = []
+    shells = shell_pages()
+    if stale([], *(os.path.join("docs", filename) for filename, _, _, _ in shells)):
+        regenerated = True
+        pages.extend(shells)
+
+    pilotes = []
+    for i, (course, scores) in enumerate(scrape_stream(pool, snapshots=snapshots)):
+        if course is PILOTS_TEST_COURSE:
+            pilotes = scores
+            hashes[course_key(PILOTS_TEST_COURSE)] = content_hash(pilotes)
+            continue
+        hashes[ranking_keys[i]] = scores.digest()
+        with METRICS.stage('aggregation'):
+            start = all_scores.attempt_count
+            merge_scores(all_scores, scores, identities)
+            event_index.update(build_event_index(all_scores, start))
+
+        # Flux de l'épreuve, écrit sans attendre les suivantes. Le sexe et
+        # le club affichés viennent de la première épreuve où le participant
+        # apparaît : il dépend donc aussi des épreuves précédentes dans
+        # l'ordre de fusion (déjà fusionnées ici).
         event_name = course['name']
-        rows = []
-        for participant, data in all_scores.items():
-            scores = data['scores'].get(event_name, [])
-            if not scores:
-                continue
-            valeurs = [calcul_valeur(s) for s in scores]
-            best_score = max(valeurs)
-            autres = [str(v) for v in valeurs if v != best_score]
-            rows.append({
-                'Participant': participant,
-                'Sexe': normalize_sexe(data['gender']),
-                'Club': data['clubname'],
-                'Score': best_score,
-                'Autres': ', '.join(autres),
-            })
-        rows.sort(key=lambda r: r['Score'], reverse=True)
-        generate_event_html(rows, f"classement_epreuve_{slugify(event_name)}.html", f"Classement — {event_name}")
-
-        if course is BONUS_COURSE:
+        need_event = stale(ranking_keys[:i + 1], event_feed_path(event_name))
+        need_deguisement_test = course is BONUS_COURSE and stale(
+            ranking_keys + ['deguisement_overrides'],
+            "docs/classement_epreuve_deguisement_test.html", DEGUISEMENT_LISTE_TEST_PATH)
+        if not (need_event or need_deguisement_test):
+            continue
+        regenerated = True
+        with METRICS.stage('aggregation'):
+            rows = build_event_rows(all_scores, event_index, event_name)
+        if need_event:
+            with METRICS.stage('feeds'):
+                export_event_json(rows, event_name)
+
+        if need_deguisement_test:
             # Page de test (doublon) pour le bonus déguisement : ajoute les
             # surcharges/ajouts manuels définis depuis la page admin.
             # N'affecte QUE cette page test, pas classement_epreuve_deguisement.html
-            # ni le classement général/Score Final officiels.
+            # ni le classement général/Score Final officiels. Le bonus est la
+            # dernière épreuve : all_scores est complet ici.
             export_deguisement_liste_json(rows, DEGUISEMENT_LISTE_TEST_PATH)
-            deguisement_overrides = load_deguisement_overrides(DEGUISEMENT_OVERRIDES_PATH)
-            rows_test = apply_deguisement_overrides(rows, deguisement_overrides, all_scores)
-            generate_event_html(rows_test, "classement_epreuve_deguisement_test.html", "Classement — Déguisement (test admin)")
-
-    # Page de test : liste des pilotes (nom, club, sexe)
-    pilotes = extract_participants_from_url(PILOTS_TEST_COURSE['url'])
-    pilotes.sort(key=lambda p: p['Participant'])
-    generate_pilots_html(pilotes, "liste_pilotes_test.html", "Liste des pilotes (test)")
+            rows_test = apply_deguisement_overrides(rows, overrides['deguisement_overrides'], all_scores, identities)
+            pages.append(event_page(rows_test, "classement_epreuve_deguisement_test.html",
+                                    "Classement — Déguisement (test admin)"))
+
+    # L'historique (base et positions) n'enregistre que des scrapes réels et
+    # complets : ni un replay ou un enregistrement de tableaux, ni un run
+    # dont un tableau a pu être tronqué (cf. read_table_rows_selenium).
+    partial = [course['name'] for course in ranked_courses if METRICS.is_partial(results_id(course['url']))]
+    keep_history = snapshots is None and not partial
+    if partial:
+        print(f"Historique non mis à jour : tableau(x) possiblement incomplet(s) ({', '.join(partial)}).")
+
+    need_ranking = stale(ranking_keys, RANKING_JSON_PATH, PILOTS_LISTE_TEST_PATH)
+    need_grid_test = stale(ranking_keys + ['gender_overrides'], "docs/pilotes_grille_test.html")
+    need_evolution = stale(ranking_keys + ['evolution_windows'], "docs/classement_evolution_test.html",
+                           EVOLUTION_STATE_PATH)
+    need_pilots = stale([course_key(PILOTS_TEST_COURSE)], "docs/liste_pilotes_test.html")
+    regenerated = regenerated or need_ranking or need_grid_test or need_evolution or need_pilots
+
+    if need_ranking or need_grid_test or need_evolution:
+        with METRICS.stage('aggregation'):
+            score_store = load_score_store(conn, EDITION, hashes['code'])
+            df, recomputed, removed = update_score_store(score_store, all_scores)
+            save_score_store(conn, EDITION, hashes['code'], recomputed, removed)
+        print(f"Classement : {len(recomputed)} participant(s) recalculé(s) sur {len(all_scores)}.")
+
+    if need_ranking and keep_history:
+        # Archivage dans l'historique multi-éditions (seulement quand les
+        # résultats ont changé : rien n'est réécrit sinon)
+        with METRICS.stage('archive'):
+            timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
+            for course in ranked_courses:
+                archive_event(conn, all_scores, course['name'], EDITION, timestamp)
+            archive_standings(conn, df, EDITION, timestamp)
+
+    if need_ranking:
+        # Flux du classement général (pages général, hommes, femmes,
+        # simplifié et grille pilotes)
+        with METRICS.stage('feeds'):
+            export_ranking_json(df, RANKING_JSON_PATH)
+
+        # Export pour la page admin (liste des pilotes + sexe calculé actuel)
+        export_pilots_liste_json(df, PILOTS_LISTE_TEST_PATH)
+
+    if need_grid_test:
+        # Page de test (doublon de la grille pilotes) avec les surcharges de sexe
+        # définies manuellement depuis la page admin. N'affecte QUE cette page
+        # test, pas le classement général ni la grille pilotes officielle.
+        df_overridden = apply_overrides(df, overrides['gender_overrides'], 'Sexe', identities)
+        pages.append(pilots_grid_page(df_overridden, "pilotes_grille_test.html", "Classement — Pilotes (test sexe)"))
+
+    if need_evolution:
+        # Page de test : évolution du classement (dernier changement significatif connu)
+        evolution_state = load_evolution_state(conn, EDITION, EVOLUTION_STATE_PATH)
+        evolution, new_evolution_state = compute_evolution(df, evolution_state)
+        # Historique des positions : fenêtres d'évolution et tendance par pilote
+        windows = sparklines = None
+        if keep_history:
+            with METRICS.stage('history'):
+                history.append(now, df)
+                windows = history.window_evolutions(df, now)
+                sparklines = history.sparklines(df)
+                hashes['evolution_windows'] = content_hash(history.window_runs(now))
+        pages.append(evolution_page(df, "classement_evolution_test.html", "Classement — Évolution (test)",
+                                    evolution, windows, sparklines))
+
+    if need_pilots:
+        # Page de test : liste des pilotes (nom, club, sexe)
+        pilotes = merge_pilots(pilotes, identities)
+        pilotes.sort(key=lambda p: p['Participant'])
+        pages.append(pilots_page(pilotes, "liste_pilotes_test.html", "Liste des pilotes (test)"))
+
+    render_pages(pages)
+    if need_evolution:
+        # Après la page : si le rendu échoue, le run suivant repart du même état
+        save_evolution_state(conn, EDITION, new_evolution_state, EVOLUTION_STATE_PATH)
+
+    if not regenerated:
+        print("Aucun changement depuis le dernier run : pages inchangées.")
+    print(f"Fichiers : {METRICS.outputs['written']} écrit(s), {METRICS.outputs['unchanged']} inchangé(s).")
+
+    if not keep_history:
+        # Historique non mis à jour : le prochain run complet le complète
+        # même si ses résultats sont identiques à ceux de ce run.
+        for key in ranking_keys + ['evolution_windows']:
+            hashes[key] = None
+    # Enregistré en dernier : si le run plante en cours de génération, le
+    # suivant régénère tout ce qui n'a pas pu l'être.
+    save_scrape_hashes(conn, hashes)
+    write_json_export(LAST_UPDATE_PATH, {
+        'generated_at': generation_time(),
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+    })
 
 
 if __name__ == "__main__":
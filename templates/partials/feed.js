@@ -0,0 +1,134 @@
+// Affichage d'un flux JSON (ranking.json ou epreuve_<épreuve>.json) : les
+// lignes (tableaux de valeurs, dans l'ordre de `columns`) sont converties en
+// objets, numérotées (Position) puis rendues en une seule fois dans target.
+//
+// La page interroge ensuite ranking_delta.json toutes les FEED_POLL_INTERVAL
+// ms (requête conditionnelle, sans paramètre anti-cache : le serveur répond
+// 304 tant que rien n'a changé). Si le flux est passé à une révision qui
+// suit celle affichée, seules les lignes dont le rendu change sont
+// remplacées ; sinon le flux entier est rechargé.
+var MEDALS = {1: "🥇", 2: "🥈", 3: "🥉"};
+var FEED_DELTA = {{ delta|tojson }};
+var FEED_POLL_INTERVAL = {{ poll_interval }};
+
+function rankLabel(position, prefix) {
+    return MEDALS[position] || (prefix || "") + position;
+}
+
+function posClass(position) {
+    return MEDALS[position] ? "pos-" + position : "";
+}
+
+function sexeBadge(sexe, short) {
+    if (sexe === "Homme") {
+        return '<span class="badge badge-homme">' + (short ? "H" : "Homme") + "</span>";
+    }
+    if (sexe === "Femme") {
+        return '<span class="badge badge-femme">' + (short ? "F" : "Femme") + "</span>";
+    }
+    return '<span class="badge badge-autre">' + (short ? "?" : "Non défini") + "</span>";
+}
+
+function loadFeed(url, target, renderRow, keep) {
+    var container = document.querySelector(target);
+    // Participant -> valeurs, ordre des participants, et pour chaque ligne
+    // affichée son élément et le HTML dont il est issu
+    var view = {columns: [], key: 0, revision: null, rows: {}, order: [], elements: {}};
+
+    function rendered() {
+        var result = [];
+        view.order.forEach(function (participant, index) {
+            var row = {Position: index + 1};
+            view.columns.forEach(function (column, i) { row[column] = view.rows[participant][i]; });
+            if (!keep || keep(row)) {
+                result.push({participant: participant, html: renderRow(row)});
+            }
+        });
+        return result;
+    }
+
+    function draw() {
+        var rows = rendered();
+        container.innerHTML = rows.map(function (row) { return row.html; }).join("");
+        view.elements = {};
+        rows.forEach(function (row, index) {
+            view.elements[row.participant] = {node: container.children[index], html: row.html};
+        });
+    }
+
+    function patch() {
+        var template = document.createElement("template");
+        var elements = {};
+        var cursor = container.firstElementChild;
+        rendered().forEach(function (row) {
+            var element = view.elements[row.participant];
+            if (!element || element.html !== row.html) {
+                template.innerHTML = row.html;
+                element = {node: template.content.firstElementChild, html: row.html};
+            }
+            elements[row.participant] = element;
+            if (element.node === cursor) {
+                cursor = cursor.nextElementSibling;
+            } else {
+                container.insertBefore(element.node, cursor);
+            }
+        });
+        // Les éléments qui ne sont plus affichés (participants retirés,
+        // lignes remplacées) ont tous été repoussés après le curseur
+        while (cursor) {
+            var next = cursor.nextElementSibling;
+            cursor.remove();
+            cursor = next;
+        }
+        view.elements = elements;
+    }
+
+    function load() {
+        return fetch(url, {cache: "no-cache"})
+            .then(function (response) { return response.json(); })
+            .then(function (feed) {
+                view.columns = feed.columns;
+                view.key = feed.columns.indexOf("Participant");
+                view.revision = feed.revision;
+                view.rows = {};
+                view.order = feed.rows.map(function (values) {
+                    view.rows[values[view.key]] = values;
+                    return values[view.key];
+                });
+                draw();
+            });
+    }
+
+    function apply(delta) {
+        delta.rows.forEach(function (values) { view.rows[values[view.key]] = values; });
+        delta.removed.forEach(function (participant) { delete view.rows[participant]; });
+        if (delta.order) {
+            view.order = delta.order;
+        }
+        view.revision = delta.revision;
+        patch();
+    }
+
+    function poll() {
+        fetch(FEED_DELTA, {cache: "no-cache"})
+            .then(function (response) { return response.json(); })
+            .then(function (deltas) {
+                var delta = deltas.feeds[url];
+                if (typeof showLastUpdate === "function") {
+                    showLastUpdate();
+                }
+                if (!delta || delta.revision === view.revision) {
+                    return;
+                }
+                if (delta.base !== null && delta.base === view.revision) {
+                    apply(delta);
+                } else {
+                    return load();
+                }
+            })
+            .catch(function () {})
+            .then(function () { setTimeout(poll, FEED_POLL_INTERVAL); });
+    }
+
+    load().catch(function () {}).then(function () { setTimeout(poll, FEED_POLL_INTERVAL); });
+}
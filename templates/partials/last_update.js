@@ -0,0 +1,14 @@
+// Heure du dernier run : les pages ne sont réécrites que si leur contenu
+// change, l'heure affichée vient donc de last_update.json (rappelée par les
+// pages coquilles à chaque interrogation de ranking_delta.json).
+function showLastUpdate() {
+    fetch("last_update.json", {cache: "no-cache"})
+        .then(function (response) { return response.json(); })
+        .then(function (update) {
+            document.querySelectorAll(".generation-time").forEach(function (element) {
+                element.textContent = update.generated_at;
+            });
+        });
+}
+
+showLastUpdate();